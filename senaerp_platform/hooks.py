@@ -88,7 +88,10 @@ website_generators = ["Website Blog"]
 # before_install = "senaerp_platform.install.before_install"
 # after_install = "senaerp_platform.install.after_install"
 
-after_migrate = ["senaerp_platform.registry.seed.seed_registry"]
+after_migrate = [
+	"senaerp_platform.registry.seed.seed_registry",
+	"senaerp_platform.registry.vector_index.snapshot",
+]
 
 # Uninstallation
 # ------------
@@ -142,6 +145,25 @@ after_migrate = ["senaerp_platform.registry.seed.seed_registry"]
 # 	}
 # }
 
+_registry_search_events = {
+	"on_update": "senaerp_platform.registry.search_cache.invalidate",
+	"on_trash": "senaerp_platform.registry.search_cache.invalidate",
+	"after_rename": "senaerp_platform.registry.search_cache.invalidate",
+}
+
+doc_events = {
+	doctype: _registry_search_events
+	for doctype in (
+		"Registry",
+		"Registry Tag",
+		"Registry Agent",
+		"Registry Tool",
+		"Registry Skill",
+		"Registry UI",
+		"Registry Logic",
+	)
+}
+
 # Scheduled Tasks
 # ---------------
 
@@ -163,6 +185,15 @@ after_migrate = ["senaerp_platform.registry.seed.seed_registry"]
 # 	],
 # }
 
+scheduler_events = {
+	"hourly": [
+		"senaerp_platform.registry.vector_index.snapshot",
+	],
+	"daily": [
+		"senaerp_platform.registry.embedding.reindex_changed",
+	],
+}
+
 # Testing
 # -------
 
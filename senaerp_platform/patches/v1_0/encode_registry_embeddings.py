@@ -0,0 +1,20 @@
+"""Convert JSON-encoded Registry embeddings to the binary vector format."""
+
+import frappe
+
+from senaerp_platform.registry.embedding import storage_dtype
+from senaerp_platform.registry.vector_codec import decode_embedding, encode_embedding
+
+
+def execute():
+	if not frappe.db.has_column("Registry", "_embedding"):
+		return
+
+	dtype = storage_dtype()
+	rows = frappe.db.sql("SELECT name, _embedding FROM `tabRegistry` WHERE _embedding LIKE '[%%'")
+	for name, value in rows:
+		vector = decode_embedding(value)
+		encoded = encode_embedding(vector, dtype) if vector is not None else None
+		frappe.db.sql("UPDATE `tabRegistry` SET _embedding = %s WHERE name = %s", (encoded, name))
+
+	frappe.db.commit()
@@ -0,0 +1,35 @@
+"""Move Registry `_search_text`/`_embedding` columns into Registry Search Index."""
+
+import frappe
+
+from senaerp_platform.registry.embedding import storage_dtype
+from senaerp_platform.registry.vector_codec import decode_embedding, encode_embedding, is_legacy
+
+
+def execute():
+	if not frappe.db.has_column("Registry", "_search_text"):
+		return
+
+	dtype = storage_dtype()
+	rows = frappe.db.sql("SELECT name, _search_text, _embedding FROM `tabRegistry`", as_dict=True)
+	for row in rows:
+		if frappe.db.exists("Registry Search Index", row.name):
+			continue
+
+		embedding = row._embedding
+		if is_legacy(embedding):
+			vector = decode_embedding(embedding)
+			embedding = encode_embedding(vector, dtype) if vector is not None else None
+
+		frappe.get_doc(
+			{
+				"doctype": "Registry Search Index",
+				"name": row.name,
+				"registry": row.name,
+				"search_text": row._search_text,
+				"embedding": embedding or None,
+			}
+		).db_insert()
+
+	frappe.db.commit()
+	frappe.db.sql_ddl("ALTER TABLE `tabRegistry` DROP COLUMN `_search_text`, DROP COLUMN `_embedding`")
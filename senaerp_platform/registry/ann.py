@@ -0,0 +1,81 @@
+"""Inverted-file (IVF) approximate nearest-neighbour index.
+
+Rows of a normalized embedding matrix are clustered with spherical k-means;
+a query is compared with the centroids first and only rows in the ``nprobe``
+closest clusters are scored exactly. ``nprobe`` trades recall for latency:
+probing every list degenerates to exact search.
+
+The index stores one list id per matrix row rather than the vectors
+themselves; ``add`` assigns rows appended to the owning matrix.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+class IVFIndex:
+	def __init__(self, centroids: np.ndarray, assignments: np.ndarray):
+		self.centroids = centroids
+		self.assignments = assignments
+
+	@property
+	def n_lists(self) -> int:
+		return len(self.centroids)
+
+	@classmethod
+	def train(
+		cls,
+		matrix: np.ndarray,
+		n_lists: int | None = None,
+		iterations: int = 8,
+		sample_size: int | None = None,
+		seed: int = 0,
+	) -> IVFIndex:
+		"""Cluster a normalized matrix into ``n_lists`` (default sqrt(n)) lists."""
+		n = len(matrix)
+		n_lists = max(1, min(n_lists or int(np.sqrt(n)), n))
+		rng = np.random.default_rng(seed)
+
+		sample_size = min(n, sample_size or 32 * n_lists)
+		sample = matrix[rng.choice(n, sample_size, replace=False)] if sample_size < n else matrix
+		sample = np.asarray(sample, dtype=np.float32)  # dequantizes a QuantizedMatrix
+		centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+
+		for _ in range(iterations):
+			labels = np.argmax(sample @ centroids.T, axis=1)
+			sums = np.zeros_like(centroids)
+			np.add.at(sums, labels, sample)
+			counts = np.bincount(labels, minlength=n_lists)
+			# Re-seed empty clusters with random sample rows
+			empty = counts == 0
+			if empty.any():
+				sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+			centroids = normalize_rows(sums)
+
+		return cls(centroids, _assign(matrix, centroids))
+
+	def add(self, matrix: np.ndarray) -> None:
+		self.assignments = np.append(self.assignments, _assign(matrix, self.centroids))
+
+	def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+		"""Row positions in the ``nprobe`` lists closest to a normalized query."""
+		nprobe = min(nprobe, self.n_lists)
+		closest = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+		probe = np.zeros(self.n_lists, dtype=bool)
+		probe[closest] = True
+		return np.flatnonzero(probe[self.assignments])
+
+
+def _assign(matrix: np.ndarray, centroids: np.ndarray, chunk: int = 4096) -> np.ndarray:
+	labels = np.empty(len(matrix), dtype=np.int32)
+	for start in range(0, len(matrix), chunk):
+		labels[start : start + chunk] = np.argmax(matrix[start : start + chunk] @ centroids.T, axis=1)
+	return labels
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+	"""L2-normalize each row (zero rows stay zero), as float32."""
+	norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+	norms[norms == 0] = 1.0
+	return (matrix / norms).astype(np.float32)
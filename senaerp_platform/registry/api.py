@@ -1,9 +1,14 @@
+import base64
+import json
+from collections import Counter
+
 import frappe
 
-from senaerp_platform.registry.embedding import (
-	fulltext_search,
-	semantic_search,
-)
+from senaerp_platform.registry import search_cache
+from senaerp_platform.registry.embedding import hybrid_ranking, lexical_ranking, semantic_ranking
+from senaerp_platform.registry.embedding_cache import normalize_query
+from senaerp_platform.registry.suggest_index import get_suggest_index
+from senaerp_platform.registry.tag_index import get_tag_index, load_tags, names_with_tags
 
 
 SEARCH_FIELDS = [
@@ -20,12 +25,28 @@ SEARCH_FIELDS = [
 	"image",
 ]
 
+# Sort key per sort_by, ending in ``name`` so every row has a unique position
+_SORT_KEYS = {
+	"featured": (("featured", "DESC"), ("modified", "DESC"), ("name", "DESC")),
+	"newest": (("creation", "DESC"), ("name", "DESC")),
+	"updated": (("modified", "DESC"), ("name", "DESC")),
+	"popular": (("install_count", "DESC"), ("name", "DESC")),
+	"alpha": (("title", "ASC"), ("name", "ASC")),
+}
+
+# JSON type of each sort key's value in a cursor (any may also be null)
+_CURSOR_TYPES = {
+	"featured": int,
+	"install_count": int,
+	"creation": str,
+	"modified": str,
+	"title": str,
+	"name": str,
+}
+
 _ORDER_FIELDS = {
-	"featured": "featured DESC, modified DESC",
-	"newest": "creation DESC",
-	"updated": "modified DESC",
-	"popular": "install_count DESC",
-	"alpha": "title ASC",
+	sort_by: ", ".join(f"{field} {direction}" for field, direction in keys)
+	for sort_by, keys in _SORT_KEYS.items()
 }
 
 EXTENSION_MAP = {
@@ -72,11 +93,46 @@ def search(
 	sort_by="featured",
 	limit=20,
 	offset=0,
+	mode="hybrid",
+	cursor=None,
 ):
-	limit = min(int(limit), 100)
-	offset = int(offset)
-	featured_only = frappe.utils.sbool(featured_only)
+	"""Search the registry catalog.
+
+	With ``q``, results are ranked by relevance and ``mode`` picks the
+	ranking: "hybrid" (default) fuses vector and FULLTEXT matches,
+	"semantic" uses vector similarity and falls back to FULLTEXT only when
+	it finds nothing. Where FULLTEXT finds nothing, typo-tolerant trigram
+	matching on titles, slugs and tags takes its place (see
+	_match_ranking). ``sort_by`` orders listings without ``q``.
+
+	Semantic and hybrid results carry ``total_exact``: False when ``total``
+	is an estimate (the ANN index scored only part of the catalog, or a
+	ranking was cut at its window).
 
+	Listings without ``q`` also return ``next_cursor``; passing it back as
+	``cursor`` fetches the following page by seeking past the last row
+	instead of skipping ``offset`` rows.
+
+	Responses are cached per normalized parameter set until the next
+	registry write (see search_cache).
+	"""
+	params = {
+		"q": normalize_query(q),
+		"item_type": item_type or None,
+		"category": category or None,
+		"tags": sorted({t.strip().lower() for t in (tags or "").split(",") if t.strip()}),
+		"trust_status": trust_status or None,
+		"featured_only": frappe.utils.sbool(featured_only),
+		"sort_by": sort_by if sort_by in _ORDER_FIELDS else "featured",
+		"limit": min(int(limit), 100),
+		"offset": int(offset),
+		"mode": "semantic" if mode == "semantic" else "hybrid",
+		"cursor": cursor or None,
+	}
+	return search_cache.get_or_compute("search", params, lambda: _search(**params))
+
+
+def _search(q, item_type, category, tags, trust_status, featured_only, sort_by, limit, offset, mode, cursor):
 	filters = {}
 	if trust_status:
 		filters["trust_status"] = trust_status
@@ -87,87 +143,66 @@ def search(
 	if featured_only:
 		filters["featured"] = 1
 
-	order_fields = _ORDER_FIELDS.get(sort_by, _ORDER_FIELDS["featured"])
-
 	if q:
-		# Try semantic search first (embedding cosine similarity)
-		semantic_results = semantic_search(q, filters=filters, limit=limit)
-		if semantic_results is not None:
-			items = semantic_results
-			total = len(items)
-			# Apply tag filter post-search if needed
-			if tags:
-				items = _filter_by_tags(items, tags)
-				total = len(items)
-			items = _attach_tags(items)
-			return {"items": items, "total": total, "limit": limit, "offset": offset}
-
-		# Fall back to FULLTEXT MATCH AGAINST
-		try:
-			sql_order = ", ".join(f"r.{p.strip()}" for p in order_fields.split(","))
-			items, total = fulltext_search(q, filters=filters, order_by=sql_order, limit=limit, offset=offset)
-			if tags:
-				items = _filter_by_tags(items, tags)
-				total = len(items)
-			items = _attach_tags(items)
-			return {"items": items, "total": total, "limit": limit, "offset": offset}
-		except Exception:
-			pass
-
-		# Final fallback: LIKE search
-		items, total = _like_search(q, tags, filters, order_fields, limit, offset)
-	elif tags:
-		items, total = _like_search(None, tags, filters, order_fields, limit, offset)
-	else:
-		items = frappe.get_list(
-			"Registry",
-			filters=filters,
-			fields=SEARCH_FIELDS,
-			order_by=order_fields,
-			limit_page_length=limit,
-			start=offset,
-		)
-		total = frappe.db.count("Registry", filters=filters)
+		ranking = _match_ranking(q, filters, tags, mode, offset + limit)
+		items = _attach_tags(_hydrate(ranking["names"][offset : offset + limit]))
+		return {
+			"items": items,
+			"total": ranking["total"],
+			"total_exact": ranking["exact"],
+			"limit": limit,
+			"offset": offset,
+		}
 
+	items, total, next_cursor = _listing(filters, tags, sort_by, limit, offset, cursor)
 	items = _attach_tags(items)
-	return {"items": items, "total": total, "limit": limit, "offset": offset}
+	return {
+		"items": items,
+		"total": total,
+		"limit": limit,
+		"offset": offset,
+		"next_cursor": next_cursor,
+	}
 
 
-def _attach_tags(items):
-	for item in items:
-		if "name" in item:
-			item["tags"] = [
-				t.tag
-				for t in frappe.get_all(
-					"Registry Tag", filters={"parent": item["name"]}, fields=["tag"]
-				)
-			]
-			del item["name"]
-		elif "tags" not in item:
-			item["tags"] = []
-	return items
+def _match_ranking(q, filters, tags, mode, depth):
+	"""Ranking dict (``names``, ``total``, ``exact``) of the items matching ``q``.
 
+	The one retrieval chain behind search() and facets(). Hybrid mode fuses
+	the semantic ranking with FULLTEXT, or with typo-tolerant trigram
+	matching on titles, slugs and tags when FULLTEXT finds nothing.
+	Semantic mode falls back to that same lexical ranking when the
+	embedding ranking is empty. ``depth`` None ranks every match.
+	"""
+	if mode != "semantic":
+		return hybrid_ranking(q, filters, tags, depth)
+	ranking = semantic_ranking(q, filters, tags, depth)
+	if ranking and ranking["names"]:
+		return ranking
+	return lexical_ranking(q, filters, tags, depth)
 
-def _filter_by_tags(items, tags_str):
-	tag_list = [t.strip().lower() for t in tags_str.split(",") if t.strip()]
-	if not tag_list:
-		return items
-	filtered = []
-	for item in items:
-		item_name = item.get("name")
-		if not item_name:
-			continue
-		item_tags = {
-			t.tag.lower()
-			for t in frappe.get_all("Registry Tag", filters={"parent": item_name}, fields=["tag"])
-		}
-		if all(t in item_tags for t in tag_list):
-			filtered.append(item)
-	return filtered
+
+def _hydrate(names):
+	"""Listing rows for ``names``, in that order, with one query."""
+	if not names:
+		return []
+	rows = {
+		row.name: row
+		for row in frappe.get_all(
+			"Registry", filters={"name": ("in", names)}, fields=SEARCH_FIELDS, limit_page_length=0
+		)
+	}
+	return [rows[name] for name in names if name in rows]
 
 
-def _like_search(q, tags, filters, order_by, limit, offset):
-	"""LIKE-based text search (last resort fallback)."""
+def _listing(filters, tags, sort_by, limit, offset=0, cursor=None):
+	"""One page of the filtered catalog in ``sort_by`` order.
+
+	With a cursor the page starts right after the row it encodes (keyset
+	pagination, see the indexes in Registry's on_doctype_update), otherwise
+	at ``offset``. The total is counted for the first page and carried in
+	the cursor after that. Returns ``(items, total, next_cursor)``.
+	"""
 	conditions = []
 	values = {}
 
@@ -175,47 +210,225 @@ def _like_search(q, tags, filters, order_by, limit, offset):
 		conditions.append(f"r.`{field}` = %({field})s")
 		values[field] = value
 
-	if q:
-		conditions.append(
-			"(r.title LIKE %(q_like)s OR r.description LIKE %(q_like)s OR rt_search.tag LIKE %(q_like)s)"
-		)
-		values["q_like"] = f"%{q}%"
-
-	if tags:
-		tag_list = [t.strip().lower() for t in tags.split(",") if t.strip()]
-		for i, tag in enumerate(tag_list):
-			key = f"tag_{i}"
-			conditions.append(
-				f"EXISTS (SELECT 1 FROM `tabRegistry Tag` rt{i} WHERE rt{i}.parent = r.name AND rt{i}.tag = %({key})s)"
-			)
-			values[key] = tag
+	tag_names = names_with_tags(tags)
+	if tag_names is not None:
+		if not tag_names:
+			return [], 0, None
+		conditions.append("r.name IN %(tag_names)s")
+		values["tag_names"] = tuple(tag_names)
 
 	where = " AND ".join(conditions) if conditions else "1=1"
-	sql_order = ", ".join(f"r.{p.strip()}" for p in order_by.split(","))
+	keys = _SORT_KEYS[sort_by]
+	if cursor:
+		total, last_values = _decode_cursor(cursor, sort_by)
+		seek, seek_values = _seek_condition(keys, last_values)
+		where = f"{where} AND {seek}"
+		values.update(seek_values)
+		offset = 0
+	else:
+		total = frappe.db.sql(f"SELECT COUNT(*) FROM `tabRegistry` r WHERE {where}", values)[0][0]
 
-	count_sql = f"""
-		SELECT COUNT(DISTINCT r.name)
+	sort_fields = ", ".join(f"r.`{field}`" for field, _ in keys if field not in SEARCH_FIELDS)
+	values["limit"] = limit + 1
+	values["offset"] = offset
+	rows = frappe.db.sql(
+		f"""
+		SELECT {", ".join(f"r.`{field}`" for field in SEARCH_FIELDS)}{", " + sort_fields if sort_fields else ""}
 		FROM `tabRegistry` r
-		LEFT JOIN `tabRegistry Tag` rt_search ON rt_search.parent = r.name
 		WHERE {where}
+		ORDER BY {", ".join(f"r.`{field}` {direction}" for field, direction in keys)}
+		LIMIT %(limit)s OFFSET %(offset)s
+		""",
+		values,
+		as_dict=True,
+	)
+
+	next_cursor = None
+	if len(rows) > limit:
+		rows = rows[:limit]
+		next_cursor = _encode_cursor(sort_by, total, [rows[-1][field] for field, _ in keys])
+
+	items = [frappe._dict({field: row[field] for field in SEARCH_FIELDS}) for row in rows]
+	return items, total, next_cursor
+
+
+def _seek_condition(keys, last_values):
+	"""SQL matching rows after ``last_values`` in the order given by ``keys``.
+
+	(a, b, c) after (x, y, z) expands to
+	a > x OR (a = x AND (b > y OR (b = y AND c > z))), per-column direction.
 	"""
-	total = frappe.db.sql(count_sql, values)[0][0]
+	values = {f"cursor_{i}": value for i, value in enumerate(last_values)}
+	condition = None
+	for i in reversed(range(len(keys))):
+		field, direction = keys[i]
+		op = "<" if direction == "DESC" else ">"
+		after = f"r.`{field}` {op} %(cursor_{i})s"
+		if condition is not None:
+			after = f"({after} OR (r.`{field}` = %(cursor_{i})s AND {condition}))"
+		condition = after
+	return condition, values
+
+
+def _encode_cursor(sort_by, total, last_values):
+	payload = json.dumps([sort_by, total, *last_values], default=str)
+	return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor, sort_by):
+	"""``(total, last_values)`` from a cursor made by _encode_cursor for ``sort_by``."""
+	try:
+		payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+	except ValueError:
+		payload = None
+	keys = _SORT_KEYS[sort_by]
+	if (
+		not isinstance(payload, list)
+		or len(payload) != len(keys) + 2
+		or payload[0] != sort_by
+		or not _is_json_type(payload[1], int)
+		or not all(
+			value is None or _is_json_type(value, _CURSOR_TYPES[field])
+			for (field, _), value in zip(keys, payload[2:], strict=True)
+		)
+	):
+		frappe.throw("Invalid or expired cursor", frappe.ValidationError)
+	return payload[1], payload[2:]
+
+
+def _is_json_type(value, type_):
+	# bool is an int subclass, but true/false is no valid count or key
+	return isinstance(value, type_) and not isinstance(value, bool)
 
-	sql = f"""
-		SELECT DISTINCT r.name, r.slug, r.title, r.item_type, r.category,
-			r.description, r.trust_status, r.featured, r.author, r.install_count,
-			r.image
+
+_FACET_FIELDS = ("item_type", "category", "trust_status")
+
+
+@frappe.whitelist(allow_guest=True)
+def facets(
+	q=None,
+	item_type=None,
+	category=None,
+	tags=None,
+	trust_status="approved",
+	featured_only=False,
+	mode="hybrid",
+):
+	"""Result counts per item_type, category, trust_status and tag.
+
+	Takes the same filters as search(). Each field facet ignores its own
+	filter, so it counts what picking another value would return; tag
+	counts are over the current results. With ``q``, every match of
+	search()'s retrieval chain is counted, not just its first page window.
+	Cached alongside search responses.
+	"""
+	params = {
+		"q": normalize_query(q),
+		"item_type": item_type or None,
+		"category": category or None,
+		"tags": sorted({t.strip().lower() for t in (tags or "").split(",") if t.strip()}),
+		"trust_status": trust_status or None,
+		"featured_only": frappe.utils.sbool(featured_only),
+		"mode": "semantic" if mode == "semantic" else "hybrid",
+	}
+	return search_cache.get_or_compute("facets", params, lambda: _facets(**params))
+
+
+def _facets(q, item_type, category, tags, trust_status, featured_only, mode):
+	filters = {"item_type": item_type, "category": category, "trust_status": trust_status}
+	filters = {field: value for field, value in filters.items() if value}
+
+	counts = {field: Counter() for field in _FACET_FIELDS}
+	tag_counts = Counter()
+	total = 0
+	item_tags = get_tag_index().item_tags
+
+	if q:
+		# Every match search() would find with the tags and featured filter,
+		# ranked once; the field filters are applied below
+		base = {"featured": 1} if featured_only else {}
+		rows = _facet_rows(names=_match_ranking(q, base, tags, mode, None)["names"])
+	else:
+		rows = _facet_rows(tags, featured_only)
+
+	# One pass over every tags/featured match, field filters applied here
+	for row in rows.values():
+		failed = [field for field, value in filters.items() if row[field] != value]
+		if len(failed) > 1:
+			continue
+		for field in _FACET_FIELDS:
+			if not failed or failed == [field]:
+				counts[field][row[field]] += 1
+		if not failed:
+			total += 1
+			tag_counts.update(item_tags.get(row["name"], []))
+
+	result = {field: _facet_list(counts[field]) for field in _FACET_FIELDS}
+	result["tags"] = _facet_list(tag_counts)
+	result["total"] = total
+	return result
+
+
+def _facet_rows(tags=None, featured_only=False, names=None):
+	"""name -> facet fields of the items with all ``tags`` (and among ``names`` if given)."""
+	conditions = []
+	values = {}
+
+	if featured_only:
+		conditions.append("r.featured = 1")
+
+	tag_names = names_with_tags(tags)
+	if tag_names is not None:
+		if not tag_names:
+			return {}
+		conditions.append("r.name IN %(tag_names)s")
+		values["tag_names"] = tuple(tag_names)
+
+	if names is not None:
+		if not names:
+			return {}
+		conditions.append("r.name IN %(names)s")
+		values["names"] = tuple(names)
+
+	where = " AND ".join(conditions) if conditions else "1=1"
+	rows = frappe.db.sql(
+		f"""
+		SELECT r.name, r.item_type, r.category, r.trust_status
 		FROM `tabRegistry` r
-		LEFT JOIN `tabRegistry Tag` rt_search ON rt_search.parent = r.name
 		WHERE {where}
-		ORDER BY {sql_order}
-		LIMIT %(limit)s OFFSET %(offset)s
+		""",
+		values,
+		as_dict=True,
+	)
+	return {row.name: row for row in rows}
+
+
+def _facet_list(counter):
+	return [{"value": value, "count": count} for value, count in counter.most_common() if value]
+
+
+@frappe.whitelist(allow_guest=True)
+def suggest(q=None, limit=8):
+	"""Typeahead completions for ``q``: approved items whose title, a word of
+	their title, slug or a tag starts with it (featured, then most installed
+	first), plus matching tags by usage. Served from an in-memory index; no
+	embedding or FULLTEXT query is made.
 	"""
-	values["limit"] = limit
-	values["offset"] = offset
+	prefix = normalize_query(q)
+	if not prefix:
+		return {"items": [], "tags": []}
+	return get_suggest_index().suggest(prefix, max(1, min(int(limit), 20)))
+
 
-	items = frappe.db.sql(sql, values, as_dict=True)
-	return items, total
+def _attach_tags(items):
+	"""Set ``tags`` on each item (and drop its internal name) with one query per page."""
+	tags = load_tags([item["name"] for item in items if "name" in item])
+	for item in items:
+		if "name" in item:
+			item["tags"] = tags.get(item.pop("name"), [])
+		elif "tags" not in item:
+			item["tags"] = []
+	return items
 
 
 @frappe.whitelist(allow_guest=True)
@@ -235,12 +448,7 @@ def get_item(slug=None):
 	if not reg:
 		frappe.throw(f"Registry item with slug '{slug}' not found", frappe.DoesNotExistError)
 
-	reg["tags"] = [
-		t.tag
-		for t in frappe.get_all(
-			"Registry Tag", filters={"parent": reg["name"]}, fields=["tag"]
-		)
-	]
+	reg["tags"] = load_tags([reg["name"]]).get(reg["name"], [])
 
 	extension = None
 	if reg.get("ref_name"):
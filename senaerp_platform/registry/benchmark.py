@@ -0,0 +1,122 @@
+"""Recall/latency benchmarks for the registry vector index (IVF and int8).
+
+Run against synthetic clustered data (no site needed)::
+
+	python -m senaerp_platform.registry.benchmark
+
+or against a site's live index::
+
+	bench --site <site> execute senaerp_platform.registry.benchmark.ann_recall --kwargs "{'live': True}"
+"""
+
+from __future__ import annotations
+
+import time
+
+import numpy as np
+
+from senaerp_platform.registry.ann import IVFIndex, normalize_rows
+from senaerp_platform.registry.quantization import QuantizedMatrix
+
+
+def synthetic_matrix(n=100_000, dim=256, clusters=500, noise=0.35, seed=0):
+	"""Normalized vectors drawn around random topic centres, like real embeddings."""
+	rng = np.random.default_rng(seed)
+	centres = rng.normal(size=(clusters, dim)).astype(np.float32)
+	matrix = centres[rng.integers(0, clusters, n)] + noise * rng.normal(size=(n, dim)).astype(np.float32)
+	return normalize_rows(matrix)
+
+
+def ann_recall(n=100_000, dim=256, queries=200, k=20, nprobes=(1, 2, 4, 8, 16, 32), live=False, seed=0):
+	"""Print recall@k and mean query latency of IVF search for each nprobe vs exact."""
+	rng = np.random.default_rng(seed)
+	if live:
+		from senaerp_platform.registry.vector_index import get_index
+
+		matrix = np.asarray(get_index().matrix, dtype=np.float32)
+	else:
+		matrix = synthetic_matrix(n, dim, seed=seed)
+
+	if len(matrix) < k:
+		print(f"Not enough vectors to benchmark ({len(matrix)})")
+		return []
+
+	sample = matrix[rng.choice(len(matrix), queries, replace=False)]
+	query_set = normalize_rows(sample + 0.1 * rng.normal(size=sample.shape).astype(np.float32))
+
+	started = time.perf_counter()
+	ivf = IVFIndex.train(matrix)
+	trained = time.perf_counter() - started
+	print(f"{len(matrix)} vectors x {matrix.shape[1]} dims, {ivf.n_lists} lists, trained in {trained:.2f}s")
+
+	exact, exact_ms = [], 0.0
+	for query in query_set:
+		started = time.perf_counter()
+		exact.append(set(_top_k(matrix @ query, k)))
+		exact_ms += (time.perf_counter() - started) * 1000
+	results = [{"nprobe": "exact", "recall": 1.0, "ms": exact_ms / queries}]
+
+	for nprobe in nprobes:
+		hits, elapsed = 0, 0.0
+		for query, truth in zip(query_set, exact, strict=True):
+			started = time.perf_counter()
+			candidates = ivf.candidates(query, nprobe)
+			found = candidates[_top_k(matrix[candidates] @ query, k)]
+			elapsed += (time.perf_counter() - started) * 1000
+			hits += len(truth.intersection(found.tolist()))
+		results.append({"nprobe": nprobe, "recall": hits / (queries * k), "ms": elapsed / queries})
+
+	print(f"{'nprobe':>8} {'recall@' + str(k):>10} {'ms/query':>10}")
+	for row in results:
+		print(f"{row['nprobe']!s:>8} {row['recall']:>10.3f} {row['ms']:>10.3f}")
+	return results
+
+
+def quantized_recall(n=100_000, dim=256, queries=200, k=20, rescores=(0, 10, 20, 50, 100), seed=0):
+	"""Print recall@k, latency and memory of int8 search with full-precision rescoring vs float32."""
+	rng = np.random.default_rng(seed)
+	matrix = synthetic_matrix(n, dim, seed=seed)
+	quantized = QuantizedMatrix.from_float(matrix)
+	print(
+		f"{n} vectors x {dim} dims: float32 {matrix.nbytes / 2**20:.1f} MiB, "
+		f"int8 {quantized.nbytes / 2**20:.1f} MiB ({matrix.nbytes / quantized.nbytes:.2f}x smaller)"
+	)
+
+	sample = matrix[rng.choice(n, queries, replace=False)]
+	query_set = normalize_rows(sample + 0.1 * rng.normal(size=sample.shape).astype(np.float32))
+
+	exact, exact_ms = [], 0.0
+	for query in query_set:
+		started = time.perf_counter()
+		exact.append(set(_top_k(matrix @ query, k).tolist()))
+		exact_ms += (time.perf_counter() - started) * 1000
+	results = [{"rescore": "float32", "recall": 1.0, "ms": exact_ms / queries}]
+
+	for rescore in rescores:
+		hits, elapsed = 0, 0.0
+		for query, truth in zip(query_set, exact, strict=True):
+			started = time.perf_counter()
+			top = _top_k(quantized @ query, max(k, rescore))
+			if rescore:
+				head = top[:rescore]
+				head = head[np.argsort(-(matrix[head] @ query), kind="stable")]
+				top = np.concatenate([head, top[rescore:]])
+			elapsed += (time.perf_counter() - started) * 1000
+			hits += len(truth.intersection(top[:k].tolist()))
+		results.append({"rescore": rescore, "recall": hits / (queries * k), "ms": elapsed / queries})
+
+	print(f"{'rescore':>8} {'recall@' + str(k):>10} {'ms/query':>10}")
+	for row in results:
+		print(f"{row['rescore']!s:>8} {row['recall']:>10.3f} {row['ms']:>10.3f}")
+	return results
+
+
+def _top_k(scores, k):
+	k = min(k, len(scores))
+	top = np.argpartition(-scores, k - 1)[:k]
+	return top[np.argsort(-scores[top])]
+
+
+if __name__ == "__main__":
+	ann_recall()
+	quantized_recall()
@@ -0,0 +1,76 @@
+"""Precomputed attribute bitmaps over indexed rows.
+
+For each filterable field the index keeps one boolean mask per distinct
+value. A filtered query ANDs the relevant masks together before anything
+is scored, so its cost follows the size of the matching subset. Tag
+filters come from tag_index, which covers every Registry item.
+
+Row positions follow the owning index: ``append`` and ``set`` mirror its
+row operations.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+BITMAP_FIELDS = ("trust_status", "item_type", "category", "featured")
+
+
+def _key(value) -> str:
+	return "" if value is None else str(value)
+
+
+class BitmapIndex:
+	def __init__(self, rows: list[dict], fields=BITMAP_FIELDS):
+		self.fields = tuple(fields)
+		self.size = len(rows)
+
+		self.masks: dict[str, dict[str, np.ndarray]] = {}
+		for field in self.fields:
+			values = np.array([_key(row.get(field)) for row in rows], dtype=object)
+			self.masks[field] = {value: values == value for value in set(values.tolist())}
+
+	def copy(self) -> BitmapIndex:
+		clone = BitmapIndex.__new__(BitmapIndex)
+		clone.fields = self.fields
+		clone.size = self.size
+		clone.masks = {field: {v: m.copy() for v, m in masks.items()} for field, masks in self.masks.items()}
+		return clone
+
+	def supports(self, filters: dict | None) -> bool:
+		return all(field in self.masks for field in filters or {})
+
+	def mask(self, filters: dict | None = None) -> np.ndarray | None:
+		"""AND of all field filters, or None when nothing filters."""
+		result = None
+		for field, value in (filters or {}).items():
+			field_mask = self.masks[field].get(_key(value))
+			if field_mask is None:
+				return np.zeros(self.size, dtype=bool)
+			result = field_mask.copy() if result is None else result & field_mask
+		return result
+
+	# -- row mutations ---------------------------------------------------------
+
+	def append(self, row: dict) -> None:
+		pos = self.size
+		self.size += 1
+		for field in self.fields:
+			value = _key(row.get(field))
+			masks = self.masks[field]
+			for v in masks:
+				masks[v] = np.append(masks[v], v == value)
+			if value not in masks:
+				masks[value] = np.zeros(self.size, dtype=bool)
+				masks[value][pos] = True
+
+	def set(self, pos: int, row: dict) -> None:
+		for field in self.fields:
+			value = _key(row.get(field))
+			masks = self.masks[field]
+			for mask in masks.values():
+				mask[pos] = False
+			if value not in masks:
+				masks[value] = np.zeros(self.size, dtype=bool)
+			masks[value][pos] = True
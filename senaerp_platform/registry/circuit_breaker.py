@@ -0,0 +1,127 @@
+"""Redis-backed circuit breaker shared by all workers of a site.
+
+closed     requests flow; outcomes are counted per ``window`` seconds. Once at
+           least ``min_requests`` were made and the failure rate reaches
+           ``failure_rate``, the circuit opens.
+open       requests are refused for ``open_seconds``.
+half_open  after that, a single probe request is let through: success closes
+           the circuit, failure opens it again.
+"""
+
+from __future__ import annotations
+
+import time
+
+import frappe
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+	def __init__(
+		self,
+		name: str,
+		failure_rate: float = 0.5,
+		min_requests: int = 5,
+		window: int = 60,
+		open_seconds: int = 30,
+	):
+		self.name = name
+		self.failure_rate = failure_rate
+		self.min_requests = min_requests
+		self.window = window
+		self.open_seconds = open_seconds
+
+	def allow(self) -> bool:
+		"""Whether a request may be sent now."""
+		state, opened_at = self._state()
+		if state == CLOSED:
+			return True
+		if state == OPEN and time.time() - opened_at < self.open_seconds:
+			return False
+		# Open long enough (or already half-open): let exactly one probe through
+		return bool(self._cache.set(self._key("probe"), 1, nx=True, ex=self.open_seconds))
+
+	def record_success(self) -> None:
+		state, _ = self._state()
+		if state == HALF_OPEN:
+			self._close()
+		elif state == CLOSED:
+			self._count("requests")
+
+	def record_failure(self) -> None:
+		state, _ = self._state()
+		if state == HALF_OPEN:
+			self._open()
+			return
+		if state == OPEN:
+			return  # a request sent before the circuit opened
+
+		requests = self._count("requests")
+		failures = self._count("failures")
+		if requests >= self.min_requests and failures / requests >= self.failure_rate:
+			self._open()
+
+	def status(self) -> dict:
+		state, opened_at = self._state()
+		if state == OPEN and time.time() - opened_at >= self.open_seconds:
+			state = HALF_OPEN
+		bucket = self._bucket()
+		requests, failures = self._cache.mget(
+			[self._key(f"requests:{bucket}"), self._key(f"failures:{bucket}")]
+		)
+		return {
+			"name": self.name,
+			"state": state,
+			"opened_at": opened_at or None,
+			"window_requests": int(requests or 0),
+			"window_failures": int(failures or 0),
+			"failure_rate": self.failure_rate,
+			"min_requests": self.min_requests,
+			"window": self.window,
+			"open_seconds": self.open_seconds,
+		}
+
+	# -- internals -------------------------------------------------------------
+
+	@property
+	def _cache(self):
+		return frappe.cache()
+
+	def _key(self, suffix: str) -> str:
+		return self._cache.make_key(f"circuit_breaker:{self.name}:{suffix}")
+
+	def _bucket(self) -> int:
+		return int(time.time() // self.window)
+
+	def _state(self) -> tuple[str, float]:
+		opened_at = self._cache.get(self._key("opened_at"))
+		if opened_at is None:
+			return CLOSED, 0.0
+		opened_at = float(opened_at)
+		if time.time() - opened_at >= self.open_seconds and self._cache.get(self._key("probe")):
+			return HALF_OPEN, opened_at
+		return OPEN, opened_at
+
+	def _count(self, counter: str) -> int:
+		key = self._key(f"{counter}:{self._bucket()}")
+		value = self._cache.incr(key)
+		if value == 1:
+			self._cache.expire(key, self.window * 2)
+		return value
+
+	def _open(self) -> None:
+		self._cache.set(self._key("opened_at"), time.time())
+		self._cache.delete(self._key("probe"))
+
+	def _close(self) -> None:
+		bucket = self._bucket()
+		self._cache.delete(
+			self._key("opened_at"),
+			self._key("probe"),
+			self._key(f"requests:{bucket}"),
+			self._key(f"failures:{bucket}"),
+		)
@@ -17,7 +17,6 @@ EXTENSION_MAP = {
 class Registry(Document):
 	def validate(self):
 		self.ensure_slug()
-		self.rebuild_search_text()
 
 	def ensure_slug(self):
 		if not self.slug:
@@ -32,9 +31,37 @@ class Registry(Document):
 			counter += 1
 			self.slug = f"{base_slug}-{counter}"
 
+	def on_update(self):
+		self.rebuild_search_text()
+		self.refresh_vector_index()
+		self.refresh_tag_index()
+		self.refresh_suggest_index()
+		self.refresh_trigram_index()
+		self.enqueue_embedding()
+
 	def rebuild_search_text(self):
-		from senaerp_platform.registry.embedding import build_search_text
-		self._search_text = build_search_text(self)
+		from senaerp_platform.registry.embedding import build_search_text, save_search_index
+		save_search_index(self.name, search_text=build_search_text(self))
+
+	def enqueue_embedding(self):
+		from senaerp_platform.registry.embedding import enqueue_embedding
+		enqueue_embedding(self.name)
+
+	def refresh_vector_index(self):
+		from senaerp_platform.registry.vector_index import refresh_item
+		refresh_item(self.name)
+
+	def refresh_tag_index(self):
+		from senaerp_platform.registry.tag_index import refresh_item
+		refresh_item(self.name)
+
+	def refresh_suggest_index(self):
+		from senaerp_platform.registry.suggest_index import refresh_item
+		refresh_item(self.name)
+
+	def refresh_trigram_index(self):
+		from senaerp_platform.registry.trigram_index import refresh_item
+		refresh_item(self.name)
 
 	def after_insert(self):
 		self.create_extension()
@@ -52,6 +79,15 @@ class Registry(Document):
 
 	def on_trash(self):
 		self.delete_extension()
+		self.delete_search_index()
+		self.refresh_vector_index()
+		self.refresh_tag_index()
+		self.refresh_suggest_index()
+		self.refresh_trigram_index()
+
+	def delete_search_index(self):
+		from senaerp_platform.registry.embedding import delete_search_index
+		delete_search_index(self.name)
 
 	def delete_extension(self):
 		if not self.ref_name:
@@ -67,3 +103,19 @@ class Registry(Document):
 		slug = re.sub(r"[\s]+", "-", slug)
 		slug = re.sub(r"-+", "-", slug).strip("-")
 		return slug
+
+
+# Composite indexes backing keyset pagination in registry.api.search: the
+# common trust_status filter followed by each sort key (see _SORT_KEYS).
+_LISTING_INDEXES = {
+	"listing_featured": ["trust_status", "featured", "modified", "name"],
+	"listing_newest": ["trust_status", "creation", "name"],
+	"listing_updated": ["trust_status", "modified", "name"],
+	"listing_popular": ["trust_status", "install_count", "name"],
+	"listing_alpha": ["trust_status", "title", "name"],
+}
+
+
+def on_doctype_update():
+	for index_name, fields in _LISTING_INDEXES.items():
+		frappe.db.add_index("Registry", fields, index_name)
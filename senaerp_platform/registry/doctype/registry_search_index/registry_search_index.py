@@ -0,0 +1,13 @@
+import frappe
+from frappe.model.document import Document
+
+
+class RegistrySearchIndex(Document):
+	pass
+
+
+def on_doctype_update():
+	if not frappe.db.has_index("tabRegistry Search Index", "search_text_fulltext"):
+		frappe.db.sql(
+			"ALTER TABLE `tabRegistry Search Index` ADD FULLTEXT INDEX search_text_fulltext (search_text)"
+		)
@@ -1,11 +1,21 @@
+import hashlib
+import http.client
 import json
-import math
-import os
-import urllib.request
-import urllib.error
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 
 import frappe
 
+from senaerp_platform.registry import embedding_cache
+from senaerp_platform.registry.circuit_breaker import CircuitBreaker
+from senaerp_platform.registry.embedding_backends import EmbeddingBackend, get_backend
+from senaerp_platform.registry.tag_index import load_tags, names_with_tags
+from senaerp_platform.registry.trigram_index import trigram_ranking
+from senaerp_platform.registry.vector_codec import encode_embedding
+from senaerp_platform.registry.vector_index import get_index, invalidate, refresh_item, snapshot
+
 
 SEARCH_FIELDS = [
 	"name", "slug", "title", "item_type", "category",
@@ -30,107 +40,287 @@ def build_search_text(doc):
 
 
 def get_embedding(text):
-	"""Generate embedding vector using OpenAI-compatible API.
+	"""Embed one text with the site's backend (see embedding_backends).
 
-	Checks in order:
-	  1. OPENAI_API_KEY env var
-	  2. site_config embedding_api_key
-	Returns None if no API key is configured.
+	Returns None if no backend is configured or the request failed.
 	"""
-	api_key = os.environ.get("OPENAI_API_KEY") or frappe.conf.get("embedding_api_key")
-	if not api_key:
-		return None
+	return get_embeddings([text])[0]
 
-	base_url = (
-		os.environ.get("OPENAI_BASE_URL")
-		or frappe.conf.get("embedding_base_url")
-		or "https://api.openai.com/v1"
-	)
-	model = (
-		os.environ.get("EMBEDDING_MODEL")
-		or frappe.conf.get("embedding_model")
-		or "text-embedding-3-small"
-	)
 
-	url = f"{base_url.rstrip('/')}/embeddings"
-	payload = json.dumps({"input": text, "model": model}).encode()
-	req = urllib.request.Request(
-		url,
-		data=payload,
-		headers={
-			"Authorization": f"Bearer {api_key}",
-			"Content-Type": "application/json",
-		},
-	)
+def get_embeddings(texts):
+	"""Embed several texts in one backend call.
+
+	Returns a list aligned with ``texts``; entries are vectors (lists or
+	NumPy arrays, so test them with ``is not None``) or None when no backend
+	is configured or a remote request failed.
+	"""
+	if not texts:
+		return []
+
+	backend = get_backend()
+	if backend is None:
+		return [None] * len(texts)
+	if not backend.remote:
+		return backend.embed(texts)
+
+	breaker = embedding_breaker()
+	if not breaker.allow():
+		return [None] * len(texts)
 
 	try:
-		with urllib.request.urlopen(req, timeout=30) as resp:
-			data = json.loads(resp.read())
-			return data["data"][0]["embedding"]
-	except (urllib.error.URLError, KeyError, IndexError) as e:
+		embeddings = backend.embed(texts)
+	except _REQUEST_ERRORS as e:
+		breaker.record_failure()
 		frappe.log_error(f"Embedding API error: {e}", "Registry Embedding")
-		return None
+		return [None] * len(texts)
+	breaker.record_success()
+	return embeddings
 
 
-def cosine_similarity(a, b):
-	dot = sum(x * y for x, y in zip(a, b))
-	norm_a = math.sqrt(sum(x * x for x in a))
-	norm_b = math.sqrt(sum(x * x for x in b))
-	if norm_a == 0 or norm_b == 0:
-		return 0.0
-	return dot / (norm_a * norm_b)
+_REQUEST_ERRORS = (OSError, http.client.HTTPException, ValueError, KeyError, IndexError)
 
 
-_SIMILARITY_THRESHOLD = 0.30
+def embedding_breaker():
+	"""Circuit breaker around the embedding provider, tuned via site_config."""
+	conf = frappe.conf
+	return CircuitBreaker(
+		"embedding",
+		failure_rate=float(conf.get("embedding_breaker_failure_rate") or 0.5),
+		min_requests=int(conf.get("embedding_breaker_min_requests") or 5),
+		window=int(conf.get("embedding_breaker_window") or 60),
+		open_seconds=int(conf.get("embedding_breaker_open_seconds") or 30),
+	)
+
+
+@frappe.whitelist()
+def get_embedding_status():
+	"""Circuit breaker state and query cache counters, for monitoring."""
+	return {
+		"circuit_breaker": embedding_breaker().status(),
+		"query_cache": embedding_cache.get_stats(),
+	}
+
 
+def embedding_model():
+	"""Model identifier of the site's backend ("" when semantic search is off)."""
+	backend = get_backend()
+	return backend.model if backend else ""
 
-def semantic_search(query, filters=None, limit=20):
-	"""Search registry items by embedding similarity.
 
-	Returns list of items sorted by relevance, or None if embeddings
-	are unavailable or no items exceed the similarity threshold.
+# Query embeddings run here so search can query MariaDB in the meantime.
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="registry-embedding")
+
+_SEARCH_DEADLINE = 2.0
+# HTTP timeout for query embeddings; a hung provider must not pin pool threads.
+_QUERY_TIMEOUT = 5
+
+
+def search_deadline():
+	"""Seconds a search waits for the query embedding (site_config ``registry_search_deadline``)."""
+	return float(frappe.conf.get("registry_search_deadline") or _SEARCH_DEADLINE)
+
+
+class QueryEmbedding:
+	"""A query embedding looked up in the cache or fetched in the background."""
+
+	def __init__(self, query):
+		backend = get_backend()
+		self.model = embedding_model()
+		self._future = None
+		self._breaker = embedding_breaker()
+
+		if backend is None or not backend.remote:
+			# In-process backends are cheaper than a cache round trip
+			self.normalized = embedding_cache.normalize_query(query)
+			self._vector = backend.embed([self.normalized])[0] if backend and self.normalized else None
+			return
+
+		_record_late_outcomes(self._breaker)
+		self.normalized, self._vector = embedding_cache.lookup(query, self.model)
+		if self._vector is None and self.normalized:
+			# While the circuit is open, searches go straight to FULLTEXT
+			if self._breaker.allow():
+				timeout = float(frappe.conf.get("embedding_request_timeout") or _QUERY_TIMEOUT)
+				self._future = _executor.submit(backend.embed, [self.normalized], timeout=timeout, retries=1)
+			else:
+				_mark_degraded()
+
+	def result(self, timeout=None):
+		"""The vector, or None if unavailable or not ready within ``timeout`` seconds."""
+		if self._future is None:
+			return self._vector
+
+		try:
+			embedding = self._future.result(timeout=None if timeout is None else max(timeout, 0))[0]
+		except FuturesTimeoutError:
+			# Our deadline, not the provider's failure (the budget may even have
+			# been spent on FULLTEXT); the fetch's own outcome is counted later
+			_mark_degraded()
+			self._future.add_done_callback(_record_when_done())
+			# Still cache the late result, so the next identical query is a hit
+			self._future.add_done_callback(embedding_cache.store_when_done(self.normalized, self.model))
+			self._future = None
+			return None
+		except _REQUEST_ERRORS as e:
+			self._breaker.record_failure()
+			_mark_degraded()
+			frappe.log_error(f"Embedding API error: {e}", "Registry Embedding")
+			embedding = None
+		else:
+			self._breaker.record_success()
+
+		self._future = None
+		if embedding is not None:
+			self._vector = embedding_cache.store(self.normalized, self.model, embedding)
+		return self._vector
+
+
+# Outcomes of query fetches that finished after their search stopped
+# waiting, as (site, failed); the next query of that site records them.
+_late_outcomes: list[tuple[str, bool]] = []
+_late_lock = threading.Lock()
+
+
+def _record_when_done():
+	"""Done-callback that queues the fetch's outcome for the circuit breaker.
+
+	It runs in the executor thread, without a request context, so it cannot
+	reach the breaker's Redis keys itself. Only transport and HTTP errors
+	(including the request's own timeout) count as failures.
 	"""
-	query_embedding = get_embedding(query)
-	if query_embedding is None:
-		return None  # Caller should fall back to fulltext
+	site = frappe.local.site
 
-	# Load items with embeddings
-	db_filters = dict(filters or {})
-	db_filters["_embedding"] = ("is", "set")
+	def callback(future):
+		error = future.exception()
+		if error is None or isinstance(error, _REQUEST_ERRORS):
+			with _late_lock:
+				_late_outcomes.append((site, error is not None))
 
-	items = frappe.get_all(
-		"Registry",
-		filters=db_filters,
-		fields=SEARCH_FIELDS + ["_embedding"],
-		limit_page_length=0,
+	return callback
+
+
+def _record_late_outcomes(breaker):
+	site = frappe.local.site
+	with _late_lock:
+		mine = [failed for entry_site, failed in _late_outcomes if entry_site == site]
+		_late_outcomes[:] = [entry for entry in _late_outcomes if entry[0] != site]
+	for failed in mine:
+		if failed:
+			breaker.record_failure()
+		else:
+			breaker.record_success()
+
+
+def _mark_degraded():
+	"""Flag this request's results as missing the semantic ranking (not cacheable)."""
+	frappe.flags.registry_search_degraded = True
+
+
+def storage_dtype():
+	"""Vector storage precision: "float32" (default) or "float16" via site_config."""
+	return frappe.conf.get("embedding_storage_dtype") or "float32"
+
+
+# Ranked semantic candidates are cached so deeper pages skip embedding and
+# scoring; the index generation in the key drops them on any catalog change.
+# At least _RANKED_MAX names are kept, more when a deeper page asks for them.
+# A depth of None (every match, for facet counts) is ranked but not cached.
+_RANKED_MAX = 1000
+_RANKED_TTL = 5 * 60
+_RANKED_KEY = "registry_semantic_ranking"
+
+
+def semantic_ranking(query, filters=None, tags=None, depth=_RANKED_MAX):
+	"""The best ``depth`` (at least _RANKED_MAX, None for all) matches by embedding similarity.
+
+	Scores the query against the per-worker vector index; ``filters`` and
+	``tags`` narrow the scored rows up front. Returns a ranking dict:
+	``names`` best first, ``total`` counting every match above the
+	similarity threshold, and ``exact``, False when that count is an
+	estimate because the ANN index only scored part of the catalog. None if
+	embeddings are unavailable or too slow (see search_deadline).
+	"""
+	return _semantic_ranking(get_index(), query, filters, tags, depth)
+
+
+def _semantic_ranking(index, query, filters, tags, depth=_RANKED_MAX):
+	"""Cached ``{"names", "total", "exact"}`` ranking at least ``depth`` deep, or None."""
+	key = _ranked_key(index, query, filters, tags)
+	ranking = _cached_ranking(key, depth)
+	if ranking is None:
+		query_embedding = QueryEmbedding(query).result(timeout=search_deadline())
+		if query_embedding is None:
+			return None
+		ranking = _rank(index, key, query_embedding, filters, tags, depth)
+	return ranking
+
+
+def _cached_ranking(key, depth):
+	ranking = frappe.cache().get_value(key)
+	if ranking is None:
+		return None
+	if depth is None and not ranking["exact"]:
+		return None  # only the ANN probes were scored
+	wanted = ranking["total"] if depth is None else min(depth, ranking["total"])
+	if len(ranking["names"]) < wanted:
+		return None  # cached window too shallow for this page
+	return ranking
+
+
+def _similarity_threshold():
+	"""Minimum cosine similarity for a semantic match (site_config ``registry_similarity_threshold``)."""
+	threshold = frappe.conf.get("registry_similarity_threshold")
+	if threshold is None:
+		backend = get_backend()
+		threshold = backend.similarity_threshold if backend else EmbeddingBackend.similarity_threshold
+	return float(threshold)
+
+
+def _ranked_key(index, query, filters, tags):
+	query = embedding_cache.normalize_query(query)
+	params = json.dumps(
+		[index.generation, embedding_model(), query, filters or {}, sorted(tags or [])],
+		sort_keys=True,
+		default=str,
 	)
+	return f"{_RANKED_KEY}:{hashlib.sha1(params.encode()).hexdigest()}"
 
-	scored = []
-	for item in items:
-		if not item.get("_embedding"):
-			continue
-		try:
-			emb = json.loads(item["_embedding"])
-		except (json.JSONDecodeError, TypeError):
-			continue
-		score = cosine_similarity(query_embedding, emb)
-		if score >= _SIMILARITY_THRESHOLD:
-			item["_score"] = score
-			del item["_embedding"]
-			scored.append(item)
-
-	if not scored:
-		return None  # Fall through to fulltext
-
-	scored.sort(key=lambda x: x["_score"], reverse=True)
-	result = scored[:limit]
-	for item in result:
-		item.pop("_score", None)
-	return result
-
-
-def fulltext_search(query, filters=None, order_by="", limit=20, offset=0):
-	"""Fallback search using MariaDB FULLTEXT MATCH AGAINST."""
+
+def _rank(index, key, query_embedding, filters, tags, depth=_RANKED_MAX):
+	"""The best ``depth`` (at least _RANKED_MAX, None for all) matches above the threshold.
+
+	Windows of a limited depth are cached under ``key``.
+	"""
+	every = depth is None  # score the whole catalog, not just the ANN probes
+	depth = len(index) if every else max(depth, _RANKED_MAX)
+	threshold = _similarity_threshold()
+	hits, total, exact = index.ranked(
+		query_embedding, filters=filters, tags=tags, limit=depth, threshold=threshold, exact=every
+	)
+	names = [index.names[pos] for pos, _ in hits]
+	if len(names) < depth or every:
+		total = len(names)  # nothing left beyond the window
+	ranking = {"names": names, "total": total, "exact": exact}
+	if not every:
+		frappe.cache().set_value(key, ranking, expires_in_sec=_RANKED_TTL)
+	return ranking
+
+
+def fulltext_count(query, filters=None, tags=None):
+	"""Number of FULLTEXT matches."""
+	where, values = _fulltext_conditions(query, filters, tags)
+	return frappe.db.sql(
+		f"""
+		SELECT COUNT(*)
+		FROM `tabRegistry` r
+		INNER JOIN `tabRegistry Search Index` si ON si.registry = r.name
+		WHERE {where}
+		""",
+		values,
+	)[0][0]
+
+
+def _fulltext_conditions(query, filters=None, tags=None):
 	conditions = []
 	values = {"query": query}
 
@@ -139,54 +329,350 @@ def fulltext_search(query, filters=None, order_by="", limit=20, offset=0):
 			conditions.append(f"r.`{field}` = %({field})s")
 			values[field] = value
 
-	conditions.append("MATCH(r._search_text) AGAINST (%(query)s IN NATURAL LANGUAGE MODE)")
-	where = " AND ".join(conditions)
+	tag_names = names_with_tags(tags)
+	if tag_names is not None:
+		conditions.append("r.name IN %(tag_names)s" if tag_names else "1=0")
+		values["tag_names"] = tuple(tag_names)
 
-	# Count
-	count_sql = f"SELECT COUNT(*) FROM `tabRegistry` r WHERE {where}"
-	total = frappe.db.sql(count_sql, values)[0][0]
+	conditions.append("MATCH(si.search_text) AGAINST (%(query)s IN NATURAL LANGUAGE MODE)")
+	return " AND ".join(conditions), values
 
-	# Relevance-ranked results
-	if not order_by:
-		order_by = "relevance DESC"
 
-	sql = f"""
-		SELECT r.name, r.slug, r.title, r.item_type, r.category,
-			r.description, r.trust_status, r.featured, r.author, r.install_count,
-			MATCH(r._search_text) AGAINST (%(query)s IN NATURAL LANGUAGE MODE) AS relevance
-		FROM `tabRegistry` r
-		WHERE {where}
-		ORDER BY {order_by}
-		LIMIT %(limit)s OFFSET %(offset)s
+def fulltext_ranking(query, filters=None, tags=None, depth=_RANKED_MAX):
+	"""The best ``depth`` (None for all) FULLTEXT matches by relevance, as a ranking dict.
+
+	Empty when the FULLTEXT index is missing.
+	"""
+	where, values = _fulltext_conditions(query, filters, tags)
+	limit = ""
+	if depth is not None:
+		limit = "LIMIT %(limit)s"
+		values["limit"] = depth
+	try:
+		names = frappe.db.sql_list(
+			f"""
+			SELECT r.name
+			FROM `tabRegistry` r
+			INNER JOIN `tabRegistry Search Index` si ON si.registry = r.name
+			WHERE {where}
+			ORDER BY MATCH(si.search_text) AGAINST (%(query)s IN NATURAL LANGUAGE MODE) DESC
+			{limit}
+			""",
+			values,
+		)
+	except Exception:
+		return {"names": [], "total": 0, "exact": True}  # No FULLTEXT index yet
+
+	if depth is None or len(names) < depth:
+		total = len(names)
+	else:
+		total = fulltext_count(query, filters, tags)
+	return {"names": names, "total": total, "exact": True}
+
+
+def lexical_ranking(query, filters=None, tags=None, depth=_RANKED_MAX):
+	"""FULLTEXT matches, or typo-tolerant trigram matches when there are none.
+
+	FULLTEXT only matches whole words, so a query it finds nothing for is
+	usually misspelled; trigram matching on titles, slugs and tags catches
+	those ("gmial" finds Gmail).
 	"""
-	values["limit"] = limit
-	values["offset"] = offset
+	ranking = fulltext_ranking(query, filters, tags, depth)
+	if ranking["names"]:
+		return ranking
+	names = trigram_ranking(query, filters, tags)
+	return {"names": names, "total": len(names), "exact": True}
+
+
+# ---------------------------------------------------------------------------
+# Hybrid (lexical + vector) ranking
+# ---------------------------------------------------------------------------
+
+_RRF_K = 60
+
+
+def hybrid_ranking(query, filters=None, tags=None, depth=_RANKED_MAX):
+	"""Semantic and lexical matches fused with reciprocal rank fusion.
+
+	The lexical side is FULLTEXT, or trigram matching when FULLTEXT finds
+	nothing (see lexical_ranking), so a few weak semantic hits never hide
+	the typo-tolerant matches. The query embedding is requested in a
+	worker thread while the FULLTEXT query runs; if it is not back within
+	search_deadline() the lexical ranking is returned on its own. Both rankings go ``depth`` (at least
+	_RANKED_MAX) deep, or include every match when ``depth`` is None.
+
+	Returns a ranking dict like semantic_ranking's. ``total`` is the size of
+	the fused set when neither ranking was cut at ``depth``, otherwise an
+	estimate (the larger retriever's own count) with ``exact`` False.
+
+	Weights per retriever come from site_config ``registry_hybrid_weights``
+	(e.g. ``{"semantic": 1.0, "fulltext": 1.5}``) and the RRF constant from
+	``registry_rrf_k``.
+	"""
+	if depth is not None:
+		depth = max(depth, _RANKED_MAX)
+	deadline = time.monotonic() + search_deadline()
+	index = get_index()
+	key = _ranked_key(index, query, filters, tags)
+	semantic = _cached_ranking(key, depth)
+
+	# Fetch the query embedding while MariaDB runs the FULLTEXT query
+	pending = QueryEmbedding(query) if semantic is None else None
+	lexical = lexical_ranking(query, filters, tags, depth)
+
+	if pending is not None:
+		query_embedding = pending.result(timeout=deadline - time.monotonic())
+		# Missed the deadline or no provider: rank on the lexical side alone
+		if query_embedding is not None:
+			semantic = _rank(index, key, query_embedding, filters, tags, depth)
+	semantic = semantic or {"names": [], "total": 0, "exact": True}
+
+	fused = reciprocal_rank_fusion(
+		{"semantic": semantic["names"], "fulltext": lexical["names"]},
+		weights=frappe.conf.get("registry_hybrid_weights"),
+		k=frappe.conf.get("registry_rrf_k") or _RRF_K,
+	)
+	if len(semantic["names"]) >= semantic["total"] and len(lexical["names"]) >= lexical["total"]:
+		return {"names": fused, "total": len(fused), "exact": semantic["exact"]}
+	return {"names": fused, "total": max(len(fused), semantic["total"], lexical["total"]), "exact": False}
 
-	items = frappe.db.sql(sql, values, as_dict=True)
-	for item in items:
-		item.pop("relevance", None)
-	return items, total
+
+def reciprocal_rank_fusion(ranked_lists, weights=None, k=_RRF_K):
+	"""Merge ranked name lists: score(d) = sum(weight / (k + rank)), best first."""
+	weights = weights or {}
+	scores = {}
+	for source, names in ranked_lists.items():
+		weight = float(weights.get(source, 1.0))
+		for rank, name in enumerate(names, 1):
+			scores[name] = scores.get(name, 0.0) + weight / (k + rank)
+	return sorted(scores, key=scores.__getitem__, reverse=True)
 
 
 def update_embedding(registry_name):
 	"""Generate and store embedding for a single registry item."""
+	embedded, written = _embed_item(registry_name)
+	if written:
+		refresh_item(registry_name)
+	return embedded
+
+
+def _embed_item(registry_name):
+	"""(whether the item has a current embedding, whether a new vector was written)."""
 	doc = frappe.get_doc("Registry", registry_name)
 	search_text = build_search_text(doc)
-	doc.db_set("_search_text", search_text, update_modified=False)
+	text_hash = content_hash(search_text)
+	model = embedding_model()
+
+	current = _index_state(registry_name).get(registry_name)
+	if not _is_stale(current, text_hash, model):
+		return True, False
 
+	values = {"search_text": search_text}
 	embedding = get_embedding(search_text)
-	if embedding:
-		doc.db_set("_embedding", json.dumps(embedding), update_modified=False)
-	return bool(embedding)
+	if embedding is not None:
+		values.update(
+			embedding=encode_embedding(embedding, storage_dtype()),
+			content_hash=text_hash,
+			embedding_model=model,
+		)
+	save_search_index(registry_name, **values)
+	return embedding is not None, embedding is not None
 
 
-@frappe.whitelist()
-def rebuild_search_index():
-	"""Rebuild search text and embeddings for all registry items."""
-	items = frappe.get_all("Registry", pluck="name")
-	success = 0
-	for name in items:
-		if update_embedding(name):
-			success += 1
+def content_hash(search_text):
+	return hashlib.sha256(search_text.encode()).hexdigest()
+
+
+# Set while an embed job for the item is queued and not yet started; saves
+# in that window are picked up by that job instead of enqueuing another.
+_EMBED_QUEUED_KEY = "registry_embed_queued"
+_EMBED_QUEUED_TTL = 60 * 60
+
+
+def enqueue_embedding(registry_name):
+	"""Schedule a background re-embed of a saved registry item.
+
+	Once the save commits, a job is enqueued unless one for the item is
+	still waiting to start, which will read the latest content anyway. The
+	job clears that marker before reading, so a save landing while it runs
+	always gets a job of its own.
+	"""
+	if get_backend() is None:
+		return
+	frappe.db.after_commit.add(lambda: _enqueue_embed_job(registry_name))
+
+
+def _enqueue_embed_job(registry_name):
+	cache = frappe.cache()
+	if cache.set(cache.make_key(f"{_EMBED_QUEUED_KEY}:{registry_name}"), 1, nx=True, ex=_EMBED_QUEUED_TTL):
+		frappe.enqueue(
+			"senaerp_platform.registry.embedding.embed_saved_item",
+			queue="default",
+			registry_name=registry_name,
+		)
+
+
+def embed_saved_item(registry_name):
+	"""Background job for enqueue_embedding."""
+	cache = frappe.cache()
+	cache.delete(cache.make_key(f"{_EMBED_QUEUED_KEY}:{registry_name}"))
+
+	frappe.db.rollback()  # start a fresh snapshot to see the latest commit
+	if not frappe.db.exists("Registry", registry_name):
+		return
+	update_embedding(registry_name)
 	frappe.db.commit()
-	return {"total": len(items), "embedded": success}
+
+
+def save_search_index(registry_name, **values):
+	"""Upsert the Registry Search Index row for a registry item.
+
+	``modified`` only moves with the embedding; the vector index snapshot
+	uses it as its watermark (see vector_index.VectorIndex.open).
+	"""
+	if frappe.db.exists("Registry Search Index", registry_name):
+		frappe.db.set_value(
+			"Registry Search Index", registry_name, values, update_modified="embedding" in values
+		)
+		return
+	frappe.get_doc({"doctype": "Registry Search Index", "registry": registry_name, **values}).insert(
+		ignore_permissions=True
+	)
+
+
+def delete_search_index(registry_name):
+	frappe.db.delete("Registry Search Index", {"registry": registry_name})
+
+
+_DEFAULT_BATCH_SIZE = 100
+
+
+@frappe.whitelist()
+def rebuild_search_index(batch_size=None, force=False):
+	"""Re-embed registry items whose search text or embedding model changed.
+
+	Search texts are built from bulk queries and hashed; only items whose
+	hash or model differs from what Registry Search Index holds (or all of
+	them with ``force``) are embedded, ``batch_size`` inputs per API request
+	(site_config ``embedding_batch_size``, default 100), and written back with
+	one multi-row upsert per batch. Finally the vector index snapshot is
+	brought up to date, so workers start from it instead of the table.
+	"""
+	batch_size = int(batch_size or frappe.conf.get("embedding_batch_size") or _DEFAULT_BATCH_SIZE)
+	force = frappe.utils.sbool(force)
+	texts = _bulk_search_texts()
+	model = embedding_model()
+	dtype = storage_dtype()
+
+	indexed = _index_state()
+	hashes = {name: content_hash(text) for name, text in texts.items()}
+	changed = [name for name in texts if force or _is_stale(indexed.get(name), hashes[name], model)]
+
+	failed = 0
+	for start in range(0, len(changed), batch_size):
+		batch = changed[start : start + batch_size]
+		embeddings = get_embeddings([texts[name] for name in batch])
+		rows = []
+		for name, embedding in zip(batch, embeddings, strict=True):
+			if embedding is not None:
+				rows.append((name, texts[name], encode_embedding(embedding, dtype), hashes[name], model))
+			else:
+				failed += 1
+				rows.append((name, texts[name], None, None, None))
+		_write_search_index(rows)
+		frappe.db.commit()
+
+		done = start + len(batch)
+		frappe.publish_progress(
+			done * 100 / len(changed),
+			title="Rebuilding registry search index",
+			description=f"{done} of {len(changed)} changed items",
+		)
+
+	if changed:
+		invalidate()
+	snapshot()
+	return {
+		"total": len(texts),
+		"changed": len(changed),
+		"unchanged": len(texts) - len(changed),
+		"failed": failed,
+	}
+
+
+def _index_state(registry_name=None):
+	"""registry -> (content_hash, embedding_model, has_embedding) without loading vectors."""
+	condition = "WHERE registry = %(registry)s" if registry_name else ""
+	rows = frappe.db.sql(
+		f"""
+		SELECT registry, content_hash, embedding_model, embedding IS NOT NULL AS has_embedding
+		FROM `tabRegistry Search Index`
+		{condition}
+		""",
+		{"registry": registry_name},
+		as_dict=True,
+	)
+	return {row.registry: row for row in rows}
+
+
+def _is_stale(current, text_hash, model):
+	if not current or not current.has_embedding:
+		return True
+	return (current.content_hash, current.embedding_model) != (text_hash, model)
+
+
+def reindex_changed():
+	"""Scheduled job: re-embed registry items changed since the last run."""
+	result = rebuild_search_index()
+	if result["failed"]:
+		frappe.log_error(f"Registry reindex: {result}", "Registry Embedding")
+
+
+def _bulk_search_texts():
+	"""Build search texts for every Registry item without loading documents."""
+	items = frappe.get_all(
+		"Registry",
+		fields=["name", "item_type", "title", "description", "category"],
+		order_by="name asc",
+		limit_page_length=0,
+	)
+	tags = load_tags()
+
+	texts = {}
+	for item in items:
+		item.tags = [frappe._dict(tag=tag) for tag in tags.get(item.name, [])]
+		texts[item.name] = build_search_text(item)
+	return texts
+
+
+def _write_search_index(rows):
+	"""Upsert (registry, search_text, embedding, content_hash, model) rows at once.
+
+	A None embedding keeps whatever vector, hash and model the row already had,
+	so a failed item stays marked as changed for the next run.
+	"""
+	if not rows:
+		return
+
+	now = frappe.utils.now()
+	user = frappe.session.user
+	placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(rows))
+	values = []
+	for name, search_text, embedding, text_hash, model in rows:
+		values += [name, name, search_text, embedding, text_hash, model, now, now, user, user]
+
+	frappe.db.sql(
+		f"""
+		INSERT INTO `tabRegistry Search Index`
+			(name, registry, search_text, embedding, content_hash, embedding_model,
+			creation, modified, owner, modified_by)
+		VALUES {placeholders}
+		ON DUPLICATE KEY UPDATE
+			search_text = VALUES(search_text),
+			content_hash = IF(VALUES(embedding) IS NULL, content_hash, VALUES(content_hash)),
+			embedding_model = IF(VALUES(embedding) IS NULL, embedding_model, VALUES(embedding_model)),
+			modified = IF(VALUES(embedding) IS NULL, modified, VALUES(modified)),
+			embedding = COALESCE(VALUES(embedding), embedding)
+		""",
+		values,
+	)
@@ -0,0 +1,194 @@
+"""Embedding backends for registry search.
+
+A backend turns texts into vectors. ``get_backend()`` picks one per site
+from site_config ``embedding_backend``:
+
+openai  an OpenAI-compatible /embeddings endpoint (default when an API key
+        is configured)
+local   hashed character n-grams plus a random projection, computed
+        in-process with NumPy; no network, used when no API key is set
+none    semantic search disabled
+
+or the dotted path of an EmbeddingBackend subclass, built with the
+``embedding_backend_options`` dict as keyword arguments.
+
+Backend objects hold all the configuration they need, so ``embed`` never
+touches frappe state and can run in a worker thread.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+
+import frappe
+import numpy as np
+
+from senaerp_platform.registry.http_client import KeepAliveClient
+
+
+class EmbeddingBackend:
+	# Identifier stored with each embedding; vectors are only comparable
+	# with a query embedded under the same model.
+	model = ""
+	# Remote backends are called in a thread, behind the circuit breaker and
+	# the query cache; in-process ones are simply called.
+	remote = False
+	# Minimum cosine similarity for a semantic match
+	similarity_threshold = 0.30
+
+	def embed(self, texts: list[str], timeout: float = 30, retries: int | None = None) -> list:
+		"""One vector (or None) per text. May raise on transport errors."""
+		raise NotImplementedError
+
+
+_OPENAI_BASE_URL = "https://api.openai.com/v1"
+_OPENAI_MODEL = "text-embedding-3-small"
+
+
+class OpenAIBackend(EmbeddingBackend):
+	remote = True
+
+	# Pooled keep-alive connections to the provider, shared per worker
+	_http = KeepAliveClient()
+
+	def __init__(self, api_key: str, base_url: str = _OPENAI_BASE_URL, model: str = _OPENAI_MODEL):
+		self.api_key = api_key
+		self.url = f"{base_url.rstrip('/')}/embeddings"
+		self.model = model
+
+	def embed(self, texts, timeout=30, retries=None):
+		data = self._http.post_json(
+			self.url,
+			{"input": list(texts), "model": self.model},
+			headers={"Authorization": f"Bearer {self.api_key}"},
+			timeout=timeout,
+			retries=retries,
+		)
+		embeddings = [None] * len(texts)
+		for row in data["data"]:
+			embeddings[row["index"]] = row["embedding"]
+		return embeddings
+
+
+class LocalBackend(EmbeddingBackend):
+	"""Hashed character n-gram vectors, projected to ``dim`` dimensions.
+
+	Each text is lower-cased and padded; every character n-gram is hashed
+	(a rolling polynomial hash with a 64-bit finalizer, vectorized over the
+	text) into one of ``buckets`` signed counts. Counts are log-scaled and
+	multiplied by a fixed Gaussian matrix seeded by ``seed``, so the same
+	configuration yields the same vectors in every worker.
+
+	Similarity is lexical (shared substrings, robust to word order and
+	inflection), not semantic, but needs no network and embeds a query in
+	well under a millisecond.
+	"""
+
+	# Unrelated catalog texts score up to about 0.22 against a query (n-gram
+	# collisions); real title or description matches score 0.25 and up.
+	similarity_threshold = 0.25
+
+	def __init__(self, dim: int = 256, ngrams=(3, 4, 5), buckets: int = 1 << 13, seed: int = 0):
+		self.dim = int(dim)
+		self.ngrams = tuple(int(n) for n in ngrams)
+		self.buckets = int(buckets)
+		self.model = f"local-ngram-{'-'.join(map(str, self.ngrams))}-{self.buckets}x{self.dim}-s{seed}"
+		rng = np.random.default_rng(seed)
+		projection = rng.standard_normal((self.buckets, self.dim)) / np.sqrt(self.dim)
+		self.projection = projection.astype(np.float32)
+
+	def embed(self, texts, timeout=30, retries=None):
+		return [self.embed_one(text) for text in texts]
+
+	def embed_one(self, text: str) -> np.ndarray | None:
+		text = " ".join((text or "").lower().split())
+		if not text:
+			return None
+		codes = np.frombuffer(f" {text} ".encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+
+		hashes = []
+		for n in self.ngrams:
+			if len(codes) < n:
+				continue
+			h = np.full(len(codes) - n + 1, n, dtype=np.uint64)
+			for j in range(n):
+				h = h * np.uint64(1_000_003) + codes[j : len(codes) - n + 1 + j]
+			hashes.append(h)
+		if not hashes:
+			return None
+
+		h = _mix64(np.concatenate(hashes))
+		signs = np.where(h >> np.uint64(63), -1.0, 1.0)
+		buckets = (h % np.uint64(self.buckets)).astype(np.int64)
+		counts = np.bincount(buckets, weights=signs, minlength=self.buckets)
+
+		nonzero = np.flatnonzero(counts)
+		weights = (np.sign(counts[nonzero]) * np.log1p(np.abs(counts[nonzero]))).astype(np.float32)
+		vector = weights @ self.projection[nonzero]
+		norm = np.linalg.norm(vector)
+		return vector / norm if norm else None
+
+
+def _mix64(h: np.ndarray) -> np.ndarray:
+	"""splitmix64 finalizer: spreads the polynomial hash over all 64 bits."""
+	h = h ^ (h >> np.uint64(30))
+	h = h * np.uint64(0xBF58476D1CE4E5B9)
+	h = h ^ (h >> np.uint64(27))
+	h = h * np.uint64(0x94D049BB133111EB)
+	return h ^ (h >> np.uint64(31))
+
+
+BACKENDS = {
+	"openai": OpenAIBackend,
+	"local": LocalBackend,
+}
+
+# (site config) -> backend instance, so a LocalBackend's projection is built once
+_instances: dict[tuple, EmbeddingBackend | None] = {}
+_lock = threading.Lock()
+
+
+def get_backend() -> EmbeddingBackend | None:
+	"""The embedding backend configured for the current site, or None."""
+	key = _config_key()
+	backend = _instances.get(key)
+	if backend is None and key not in _instances:
+		with _lock:
+			if key not in _instances:
+				_instances[key] = _create(*key)
+			backend = _instances[key]
+	return backend
+
+
+def api_key() -> str | None:
+	return os.environ.get("OPENAI_API_KEY") or frappe.conf.get("embedding_api_key")
+
+
+def _config_key() -> tuple:
+	conf = frappe.conf
+	name = conf.get("embedding_backend") or ("openai" if api_key() else "local")
+	if name == "openai":
+		base_url = os.environ.get("OPENAI_BASE_URL") or conf.get("embedding_base_url")
+		options = {
+			"api_key": api_key(),
+			"base_url": base_url or _OPENAI_BASE_URL,
+			"model": os.environ.get("EMBEDDING_MODEL") or conf.get("embedding_model") or _OPENAI_MODEL,
+		}
+	else:
+		options = conf.get("embedding_backend_options") or {}
+	return name, tuple(sorted((k, _hashable(v)) for k, v in options.items()))
+
+
+def _hashable(value):
+	return tuple(value) if isinstance(value, list) else value
+
+
+def _create(name: str, options: tuple) -> EmbeddingBackend | None:
+	if name == "none":
+		return None
+	options = dict(options)
+	if name == "openai" and not options.get("api_key"):
+		return None
+	backend_class = BACKENDS.get(name) or frappe.get_attr(name)
+	return backend_class(**options)
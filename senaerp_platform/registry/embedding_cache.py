@@ -0,0 +1,161 @@
+"""Two-tier cache for query embeddings.
+
+Search queries repeat a lot (the same text typed twice, popular terms), and
+each miss costs an HTTPS round trip to the embedding provider. Vectors are
+cached per (model, normalized text) in a bounded in-worker LRU, backed by
+Redis so other workers and restarts benefit too.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import frappe
+
+from senaerp_platform.registry.vector_codec import decode_embedding, encode_embedding
+
+
+_LOCAL_MAX_SIZE = 1024
+_LOCAL_TTL = 10 * 60
+_REDIS_TTL = 24 * 60 * 60
+
+_KEY_PREFIX = "registry_query_embedding"
+_STATS_KEY = "registry_query_embedding_stats"
+
+
+class LRUCache:
+	"""Thread-safe LRU with a per-entry time-to-live."""
+
+	def __init__(self, max_size: int, ttl: float):
+		self.max_size = max_size
+		self.ttl = ttl
+		self._data: OrderedDict = OrderedDict()
+		self._lock = threading.Lock()
+
+	def get(self, key):
+		with self._lock:
+			entry = self._data.get(key)
+			if entry is None:
+				return None
+			expires_at, value = entry
+			if expires_at < time.monotonic():
+				del self._data[key]
+				return None
+			self._data.move_to_end(key)
+			return value
+
+	def set(self, key, value) -> None:
+		with self._lock:
+			self._data[key] = (time.monotonic() + self.ttl, value)
+			self._data.move_to_end(key)
+			while len(self._data) > self.max_size:
+				self._data.popitem(last=False)
+
+	def __len__(self) -> int:
+		return len(self._data)
+
+
+_local = LRUCache(_LOCAL_MAX_SIZE, _LOCAL_TTL)
+_stats = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+
+# (site, redis key, encoded vector) computed outside a request, written to
+# Redis by the next lookup on that site
+_deferred: list[tuple[str, str, str]] = []
+_deferred_lock = threading.Lock()
+
+
+def normalize_query(text: str) -> str:
+	return re.sub(r"\s+", " ", (text or "").strip().lower())
+
+
+def lookup(text: str, model: str):
+	"""Return ``(normalized_text, vector)``; vector is None on a miss."""
+	normalized = normalize_query(text)
+	if not normalized:
+		return normalized, None
+	if _deferred:
+		_flush_deferred()
+
+	local_key, redis_key = _keys(normalized, model)
+	vector = _local.get(local_key)
+	if vector is not None:
+		_count("local_hits")
+		return normalized, vector
+
+	vector = decode_embedding(frappe.cache().get_value(redis_key))
+	if vector is not None:
+		_count("redis_hits")
+		_local.set(local_key, vector)
+		return normalized, vector
+
+	_count("misses")
+	return normalized, None
+
+
+def store(normalized: str, model: str, vector):
+	"""Cache a freshly computed vector in both tiers; returns it as float32."""
+	local_key, redis_key = _keys(normalized, model)
+	encoded = encode_embedding(vector)
+	frappe.cache().set_value(redis_key, encoded, expires_in_sec=_REDIS_TTL)
+	vector = decode_embedding(encoded)
+	_local.set(local_key, vector)
+	return vector
+
+
+def store_when_done(normalized: str, model: str):
+	"""Done-callback for a fetch nobody waits for any more (see QueryEmbedding).
+
+	It runs in the executor thread, without a request context, so the vector
+	goes straight into the in-worker tier and its Redis write is deferred.
+	"""
+	site = frappe.local.site
+	local_key, redis_key = _keys(normalized, model)
+
+	def callback(future):
+		try:
+			vector = future.result()[0]
+		except Exception:
+			return
+		if vector is None:
+			return
+		encoded = encode_embedding(vector)
+		_local.set(local_key, decode_embedding(encoded))
+		with _deferred_lock:
+			_deferred.append((site, redis_key, encoded))
+
+	return callback
+
+
+def _flush_deferred() -> None:
+	site = frappe.local.site
+	with _deferred_lock:
+		mine = [entry for entry in _deferred if entry[0] == site]
+		_deferred[:] = [entry for entry in _deferred if entry[0] != site]
+	for _, redis_key, encoded in mine:
+		frappe.cache().set_value(redis_key, encoded, expires_in_sec=_REDIS_TTL)
+
+
+def _keys(normalized: str, model: str):
+	digest = hashlib.sha1(f"{model}\0{normalized}".encode()).hexdigest()
+	return f"{frappe.local.site}:{digest}", f"{_KEY_PREFIX}:{digest}"
+
+
+def _count(counter: str) -> None:
+	_stats[counter] += 1
+	cache = frappe.cache()
+	cache.incr(cache.make_key(f"{_STATS_KEY}:{counter}"))
+
+
+def get_stats() -> dict:
+	"""Hit/miss counters for this worker and summed across all workers."""
+	cache = frappe.cache()
+	counters = list(_stats)
+	shared = cache.mget([cache.make_key(f"{_STATS_KEY}:{counter}") for counter in counters])
+	return {
+		"worker": dict(_stats, local_size=len(_local)),
+		"site": {counter: int(value or 0) for counter, value in zip(counters, shared, strict=True)},
+	}
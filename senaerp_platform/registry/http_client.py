@@ -0,0 +1,147 @@
+"""Keep-alive JSON-over-HTTP client with connection pooling and retries.
+
+One client per worker process keeps a small LIFO pool of open
+``http.client`` connections per host, so consecutive embedding requests
+reuse the TCP/TLS session instead of handshaking each time. Responses may be
+gzip-compressed. 429 and 5xx responses (and dropped connections) are
+retried with jittered exponential backoff, honouring ``Retry-After``.
+"""
+
+from __future__ import annotations
+
+import gzip
+import http.client
+import json
+import queue
+import random
+import ssl
+import threading
+import time
+import urllib.parse
+
+
+# Errors meaning a pooled keep-alive connection was closed by the server
+_STALE_ERRORS = (
+	http.client.RemoteDisconnected,
+	http.client.CannotSendRequest,
+	ConnectionResetError,
+	BrokenPipeError,
+	ConnectionAbortedError,
+)
+
+
+class HTTPStatusError(OSError):
+	def __init__(self, status: int, body: bytes):
+		super().__init__(f"HTTP {status}: {body[:500].decode(errors='replace')}")
+		self.status = status
+
+
+class KeepAliveClient:
+	def __init__(
+		self, max_connections: int = 8, max_retries: int = 3, backoff: float = 0.5, max_backoff: float = 8.0
+	):
+		self.max_connections = max_connections
+		self.max_retries = max_retries
+		self.backoff = backoff
+		self.max_backoff = max_backoff
+		self._pools: dict[tuple, queue.LifoQueue] = {}
+		self._lock = threading.Lock()
+		self._ssl_context = ssl.create_default_context()
+
+	def post_json(
+		self, url: str, payload, headers: dict | None = None, timeout: float = 30, retries: int | None = None
+	):
+		"""POST ``payload`` as JSON and return the decoded JSON response."""
+		parts = urllib.parse.urlsplit(url)
+		path = parts.path + (f"?{parts.query}" if parts.query else "")
+		body = json.dumps(payload).encode()
+		headers = {
+			"Content-Type": "application/json",
+			"Accept-Encoding": "gzip",
+			"Connection": "keep-alive",
+			**(headers or {}),
+		}
+		retries = self.max_retries if retries is None else retries
+
+		for attempt in range(retries + 1):
+			try:
+				status, response_headers, data = self._request(parts, path, body, headers, timeout)
+			except ConnectionError:
+				if attempt >= retries:
+					raise
+				self._sleep(attempt)
+				continue
+
+			if (status == 429 or status >= 500) and attempt < retries:
+				self._sleep(attempt, response_headers.get("Retry-After"))
+				continue
+			if status >= 400:
+				raise HTTPStatusError(status, data)
+			return json.loads(data)
+
+	# -- internals -------------------------------------------------------------
+
+	def _request(self, parts, path, body, headers, timeout):
+		key = (parts.scheme, parts.hostname, parts.port)
+		conn, reused = self._acquire(key, parts, timeout)
+		try:
+			try:
+				status, response_headers, data, will_close = self._send(conn, path, body, headers, timeout)
+			except _STALE_ERRORS:
+				if not reused:
+					raise
+				# The server dropped an idle connection; retry once on a fresh one
+				conn.close()
+				conn = self._connect(parts, timeout)
+				status, response_headers, data, will_close = self._send(conn, path, body, headers, timeout)
+		except BaseException:
+			conn.close()
+			raise
+
+		self._release(key, conn, will_close)
+		return status, response_headers, data
+
+	def _send(self, conn, path, body, headers, timeout):
+		conn.timeout = timeout
+		if conn.sock is not None:
+			conn.sock.settimeout(timeout)
+		conn.request("POST", path, body=body, headers=headers)
+		response = conn.getresponse()
+		data = response.read()
+		if response.getheader("Content-Encoding", "").lower() == "gzip":
+			data = gzip.decompress(data)
+		return response.status, response.headers, data, response.will_close
+
+	def _pool(self, key) -> queue.LifoQueue:
+		with self._lock:
+			return self._pools.setdefault(key, queue.LifoQueue(self.max_connections))
+
+	def _acquire(self, key, parts, timeout):
+		try:
+			return self._pool(key).get_nowait(), True
+		except queue.Empty:
+			return self._connect(parts, timeout), False
+
+	def _release(self, key, conn, will_close: bool) -> None:
+		if will_close:
+			conn.close()
+			return
+		try:
+			self._pool(key).put_nowait(conn)
+		except queue.Full:
+			conn.close()
+
+	def _connect(self, parts, timeout):
+		if parts.scheme == "https":
+			return http.client.HTTPSConnection(
+				parts.hostname, parts.port, timeout=timeout, context=self._ssl_context
+			)
+		return http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+
+	def _sleep(self, attempt: int, retry_after: str | None = None) -> None:
+		delay = min(self.max_backoff, self.backoff * 2**attempt) * random.uniform(0.5, 1.0)
+		try:
+			delay = max(delay, min(float(retry_after), self.max_backoff))
+		except (TypeError, ValueError):
+			pass
+		time.sleep(delay)
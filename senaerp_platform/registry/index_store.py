@@ -0,0 +1,167 @@
+"""Versioned on-disk copies of the vector index, shared between workers.
+
+Each version is a directory under ``<site>/private/registry_vector_index``
+holding the index matrix as ``.npy`` files (int8 codes and scales, or one
+float32 matrix), the IVF centroids and assignments when present, the row
+names and a small ``meta.json``. Workers open them with
+``numpy.load(mmap_mode="r")``, so every worker on the host scores against
+the same pages in the OS page cache instead of a private copy.
+
+A version is written into a temporary directory and renamed into place,
+then the ``CURRENT`` pointer file is replaced atomically; readers never see
+a partial version. Superseded versions are deleted after a few newer ones
+exist, which is safe on POSIX as open mappings stay valid after unlink.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+import frappe
+import numpy as np
+
+from senaerp_platform.registry.ann import IVFIndex
+from senaerp_platform.registry.quantization import QuantizedMatrix
+
+
+_DIRECTORY = "registry_vector_index"
+_CURRENT = "CURRENT"
+_KEEP_VERSIONS = 3
+_CLAIM_TTL = 15 * 60
+
+
+class StoredIndex:
+	def __init__(self, version: str, meta: dict, names: list[str], matrix, ann: IVFIndex | None):
+		self.version = version
+		self.meta = meta
+		self.names = names
+		self.matrix = matrix
+		self.ann = ann
+
+
+def root() -> str:
+	return frappe.get_site_path("private", _DIRECTORY)
+
+
+def claim(generation: int) -> bool:
+	"""Whether this process should write the version for ``generation`` (first caller wins)."""
+	path = root()
+	os.makedirs(path, exist_ok=True)
+	try:
+		os.close(os.open(os.path.join(path, f".write-{generation}.lock"), os.O_CREAT | os.O_EXCL))
+	except FileExistsError:
+		return False
+	return True
+
+
+def save(names: list[str], matrix, ann: IVFIndex | None, meta: dict) -> str:
+	"""Write a new version and make it current. Returns the version name."""
+	path = root()
+	os.makedirs(path, exist_ok=True)
+	# Names sort by creation time
+	version = f"{time.time_ns():020d}-g{int(meta.get('generation') or 0)}"
+	staging = tempfile.mkdtemp(prefix=".tmp-", dir=path)
+	try:
+		if isinstance(matrix, QuantizedMatrix):
+			np.save(os.path.join(staging, "codes.npy"), matrix.codes)
+			np.save(os.path.join(staging, "scales.npy"), matrix.scales)
+		else:
+			np.save(os.path.join(staging, "matrix.npy"), np.asarray(matrix, dtype=np.float32))
+		if ann is not None:
+			np.save(os.path.join(staging, "centroids.npy"), ann.centroids)
+			np.save(os.path.join(staging, "assignments.npy"), ann.assignments)
+		_write_json(os.path.join(staging, "names.json"), names)
+		_write_json(
+			os.path.join(staging, "meta.json"), {**meta, "quantized": isinstance(matrix, QuantizedMatrix)}
+		)
+		os.rename(staging, os.path.join(path, version))
+	except BaseException:
+		shutil.rmtree(staging, ignore_errors=True)
+		raise
+
+	pointer = os.path.join(path, f".{_CURRENT}-{uuid.uuid4().hex[:8]}")
+	with open(pointer, "w") as f:
+		f.write(version)
+	os.replace(pointer, os.path.join(path, _CURRENT))
+
+	_cleanup(path)
+	return version
+
+
+def load() -> StoredIndex | None:
+	"""Memory-map the current version, or None if there is none (or it vanished)."""
+	path = root()
+	version = _current_version(path)
+	if not version:
+		return None
+	try:
+		directory = os.path.join(path, version)
+		with open(os.path.join(directory, "meta.json")) as f:
+			meta = json.load(f)
+		with open(os.path.join(directory, "names.json")) as f:
+			names = json.load(f)
+
+		if meta.get("quantized"):
+			matrix = QuantizedMatrix(
+				np.load(os.path.join(directory, "codes.npy"), mmap_mode="r"),
+				np.load(os.path.join(directory, "scales.npy"), mmap_mode="r"),
+			)
+		else:
+			matrix = np.load(os.path.join(directory, "matrix.npy"), mmap_mode="r")
+
+		ann = None
+		if os.path.exists(os.path.join(directory, "centroids.npy")):
+			ann = IVFIndex(
+				np.load(os.path.join(directory, "centroids.npy"), mmap_mode="r"),
+				np.load(os.path.join(directory, "assignments.npy"), mmap_mode="r"),
+			)
+	except (OSError, ValueError):
+		return None
+
+	if len(matrix) != len(names):
+		return None
+	return StoredIndex(version, meta, names, matrix, ann)
+
+
+def _current_version(path: str) -> str | None:
+	try:
+		with open(os.path.join(path, _CURRENT)) as f:
+			return f.read().strip()
+	except FileNotFoundError:
+		return None
+
+
+def _write_json(path: str, value) -> None:
+	with open(path, "w") as f:
+		json.dump(value, f)
+
+
+def _cleanup(path: str) -> None:
+	current = _current_version(path)
+	versions = sorted(
+		(entry for entry in os.listdir(path) if not entry.startswith(".") and entry != _CURRENT),
+		reverse=True,
+	)
+	for version in versions[_KEEP_VERSIONS:]:
+		if version != current:
+			shutil.rmtree(os.path.join(path, version), ignore_errors=True)
+
+	# Stale write claims (and leftovers of crashed writers) are dropped after a while,
+	# so a generation counter that restarted in Redis can be written again.
+	cutoff = time.time() - _CLAIM_TTL
+	for entry in os.listdir(path):
+		if entry.startswith((".write-", ".tmp-", f".{_CURRENT}-")):
+			entry_path = os.path.join(path, entry)
+			try:
+				if os.path.getmtime(entry_path) < cutoff:
+					if os.path.isdir(entry_path):
+						shutil.rmtree(entry_path, ignore_errors=True)
+					else:
+						os.remove(entry_path)
+			except FileNotFoundError:
+				pass
@@ -0,0 +1,89 @@
+"""Int8 scalar quantization of embedding matrices.
+
+Each row is stored as int8 codes plus one float32 scale (max |x| / 127), so
+a d-dimensional float32 vector shrinks from 4d to d + 4 bytes. Scores are
+computed asymmetrically: the float32 query against dequantized codes,
+chunk by chunk so no full float32 copy of the matrix is ever materialized.
+
+QuantizedMatrix mimics the small part of the ndarray interface the vector
+and IVF indexes use (row indexing and assignment, ``@``, ``len``,
+``shape``, ``copy``), so either can back a VectorIndex.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+_CHUNK = 1024
+
+
+def quantize(matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+	"""(int8 codes, float32 per-row scales) for a 2-D float matrix."""
+	matrix = np.asarray(matrix, dtype=np.float32)
+	scales = np.abs(matrix).max(axis=1) / 127.0 if matrix.size else np.zeros(len(matrix), np.float32)
+	scales = scales.astype(np.float32)
+	safe = np.where(scales == 0, 1.0, scales)[:, None]
+	codes = np.clip(np.rint(matrix / safe), -127, 127).astype(np.int8)
+	return codes, scales
+
+
+class QuantizedMatrix:
+	def __init__(self, codes: np.ndarray, scales: np.ndarray):
+		self.codes = codes
+		self.scales = scales
+
+	@classmethod
+	def from_float(cls, matrix: np.ndarray) -> QuantizedMatrix:
+		return cls(*quantize(matrix))
+
+	@property
+	def shape(self) -> tuple[int, int]:
+		return self.codes.shape
+
+	@property
+	def nbytes(self) -> int:
+		return self.codes.nbytes + self.scales.nbytes
+
+	def __len__(self) -> int:
+		return len(self.codes)
+
+	def __array__(self, dtype=None, copy=None):
+		matrix = self.codes.astype(np.float32) * self.scales[:, None]
+		return matrix if dtype is None else matrix.astype(dtype)
+
+	def __getitem__(self, rows) -> QuantizedMatrix:
+		if isinstance(rows, (int, np.integer)):
+			rows = slice(rows, rows + 1 or None)
+		return QuantizedMatrix(self.codes[rows], self.scales[rows])
+
+	def __setitem__(self, row: int, value) -> None:
+		if isinstance(value, QuantizedMatrix):
+			codes, scales = value.codes, value.scales
+		else:
+			codes, scales = quantize(np.asarray(value, dtype=np.float32).reshape(1, -1))
+		self.codes[row] = codes[0]
+		self.scales[row] = scales[0]
+
+	def __matmul__(self, other: np.ndarray) -> np.ndarray:
+		other = np.asarray(other, dtype=np.float32)
+		out = np.empty((len(self), *other.shape[1:]), dtype=np.float32)
+		# Dequantize through one cache-sized float32 buffer
+		buffer = np.empty((min(_CHUNK, len(self)), self.shape[1]), dtype=np.float32)
+		for start in range(0, len(self), _CHUNK):
+			codes = self.codes[start : start + _CHUNK]
+			block = buffer[: len(codes)]
+			np.copyto(block, codes, casting="unsafe")
+			scale = self.scales[start : start + _CHUNK]
+			out[start : start + len(codes)] = (block @ other) * (scale if other.ndim == 1 else scale[:, None])
+		return out
+
+	def copy(self) -> QuantizedMatrix:
+		return QuantizedMatrix(self.codes.copy(), self.scales.copy())
+
+	def append(self, matrix) -> QuantizedMatrix:
+		if isinstance(matrix, QuantizedMatrix):
+			codes, scales = matrix.codes, matrix.scales
+		else:
+			codes, scales = quantize(matrix)
+		return QuantizedMatrix(np.vstack([self.codes, codes]), np.concatenate([self.scales, scales]))
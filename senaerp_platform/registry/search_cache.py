@@ -0,0 +1,59 @@
+"""Redis cache of registry search responses.
+
+Responses are keyed by the normalized search parameters plus two
+generation counters: this module's own, bumped after commit whenever a
+Registry or extension doc changes (see ``doc_events`` in hooks.py), and the
+vector index generation, which also moves when a background job stores a
+new embedding. A write therefore makes every cached response unreachable
+at once; stale entries simply expire.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+
+import frappe
+
+from senaerp_platform.registry import site_index, vector_index
+
+
+# Moves after every committed registry write.
+GENERATION_KEY = "registry_search_cache_generation"
+_TTL = 600
+
+
+def get_or_compute(namespace: str, params: dict, compute):
+	"""Return the cached response for ``params``, calling ``compute`` on a miss.
+
+	Responses built while the semantic ranking was unavailable (see
+	``embedding._mark_degraded``) are returned but not cached.
+	"""
+	cache = frappe.cache()
+	key = _key(namespace, params)
+	response = cache.get_value(key)
+	if response is not None:
+		return response
+
+	frappe.flags.registry_search_degraded = False
+	response = compute()
+	if not frappe.flags.registry_search_degraded:
+		ttl = int(frappe.conf.get("registry_search_cache_ttl") or _TTL)
+		cache.set_value(key, response, expires_in_sec=ttl)
+	return response
+
+
+def _key(namespace: str, params: dict) -> str:
+	cache = frappe.cache()
+	generations = cache.mget([cache.make_key(GENERATION_KEY), cache.make_key(vector_index._GENERATION_KEY)])
+	payload = json.dumps([namespace, params, [int(g or 0) for g in generations]], sort_keys=True, default=str)
+	return f"registry_search:{hashlib.sha1(payload.encode()).hexdigest()}"
+
+
+def invalidate(doc=None, method=None):
+	"""doc_events hook: drop all cached responses once the write commits."""
+	frappe.db.after_commit.add(_bump_generation)
+
+
+def _bump_generation():
+	site_index.bump_generation(GENERATION_KEY)
@@ -0,0 +1,85 @@
+"""Per-worker holders for the registry's in-memory indexes.
+
+Each index (vector, tag, suggest, trigram) is built once per site in every
+worker and tagged with a generation counter kept in Redis. A worker whose
+copy is behind the counter rebuilds it on next use. The worker that made a
+change can instead publish it: bump the counter and patch a copy of its
+own index, which is swapped in whole so concurrent readers never see a
+half-updated index.
+"""
+
+from __future__ import annotations
+
+import threading
+
+import frappe
+
+
+def generation(key: str) -> int:
+	cache = frappe.cache()
+	return int(cache.get(cache.make_key(key)) or 0)
+
+
+def bump_generation(key: str) -> int:
+	cache = frappe.cache()
+	return cache.incr(cache.make_key(key))
+
+
+class SiteIndexes:
+	"""site -> index, rebuilt with ``build(generation)`` when ``generation_key`` moves.
+
+	Indexes only need a ``generation`` attribute, plus ``copy()`` to be
+	patched through ``publish``.
+	"""
+
+	def __init__(self, build, generation_key: str):
+		self.build = build
+		self.generation_key = generation_key
+		self._indexes: dict = {}
+		self._lock = threading.Lock()
+
+	def get(self):
+		"""This worker's index for the current site, rebuilding if stale."""
+		current = generation(self.generation_key)
+		index = self._indexes.get(frappe.local.site)
+		if index is not None and index.generation == current:
+			return index
+
+		with self._lock:
+			index = self._indexes.get(frappe.local.site)
+			if index is None or index.generation != current:
+				index = self.build(current)
+				self._indexes[frappe.local.site] = index
+		return index
+
+	def invalidate(self) -> None:
+		"""Force every worker to rebuild on next use."""
+		bump_generation(self.generation_key)
+		self._indexes.pop(frappe.local.site, None)
+
+	def publish(self, patch) -> None:
+		"""Bump the generation; ``patch(index)`` brings a copy of ours up to it.
+
+		Call after commit. If another worker published in between, our copy
+		is stale anyway and is dropped instead.
+		"""
+		current = bump_generation(self.generation_key)
+		index = self._indexes.get(frappe.local.site)
+		if index is None:
+			return
+		if index.generation != current - 1:
+			self._indexes.pop(frappe.local.site, None)
+			return
+
+		patched = index.copy()
+		patch(patched)
+		patched.generation = current
+		with self._lock:
+			self._indexes[frappe.local.site] = patched
+
+	def replace(self, index) -> None:
+		"""Swap in an equivalent ``index``, e.g. a compacted one, unless ours has moved on."""
+		with self._lock:
+			current = self._indexes.get(frappe.local.site)
+			if current is not None and current.generation == index.generation:
+				self._indexes[frappe.local.site] = index
@@ -0,0 +1,222 @@
+"""Per-worker prefix index for registry typeahead.
+
+Every approved Registry item contributes lower-cased keys: its title, the
+title from each later word on ("github" finds "Sync GitHub Issues"), its
+slug and its tags. Keys live in one sorted list; a prefix lookup is two
+bisects and the matching items are ranked featured first, then by
+install_count. Tags get a second sorted list for tag completions.
+
+Kept in sync like the tag index (see site_index): saving or trashing a
+Registry doc bumps this index's own Redis generation after commit, the
+saving worker patches a copy of its index and every other worker
+rebuilds on next use. Writes to other doctypes leave it alone.
+"""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_left, bisect_right
+
+import frappe
+import numpy as np
+
+from senaerp_platform.registry.embedding_cache import normalize_query
+from senaerp_platform.registry.site_index import SiteIndexes
+from senaerp_platform.registry.tag_index import load_tags
+
+
+_GENERATION_KEY = "registry_suggest_index_generation"
+_ITEM_FIELDS = ("name", "slug", "title", "item_type", "trust_status", "featured", "install_count")
+_WORD_START = re.compile(r"(?<=[\s\-_/.:])\w")
+# Results for the most recent prefixes (short ones match most keys)
+_MEMO_SIZE = 4096
+
+
+class SuggestIndex:
+	def __init__(self, items: list[dict], item_tags: dict[str, list[str]], generation: int = 0):
+		self.generation = generation
+		# Positions are append-only; a removed item keeps its slot but leaves every key.
+		self.ids = {item["name"]: pos for pos, item in enumerate(items)}
+		self.items = [_listing(item) for item in items]
+		# Ascending rank = better: featured first, then most installed
+		self.rank = np.array([_rank(item) for item in items], dtype=np.float64)
+		self.item_tags = [_tag_keys(item_tags.get(item["name"])) for item in items]
+		self.item_keys = [_item_keys(item) | tags for item, tags in zip(items, self.item_tags, strict=True)]
+		self.max_keys = max([1, *(len(keys) for keys in self.item_keys)])
+
+		entries = sorted((key, pos) for pos, keys in enumerate(self.item_keys) for key in keys)
+		self.keys = [key for key, _ in entries]
+		self.positions = np.array([pos for _, pos in entries], dtype=np.int32)
+		self.entry_rank = self.rank[self.positions] if len(entries) else np.empty(0)
+
+		tag_counts: dict[str, int] = {}
+		for tags in self.item_tags:
+			for tag in tags:
+				tag_counts[tag] = tag_counts.get(tag, 0) + 1
+		self.tags = sorted(tag_counts)
+		self.tag_counts = np.array([tag_counts[tag] for tag in self.tags], dtype=np.int32)
+
+		self._memo: dict[tuple, dict] = {}
+
+	@classmethod
+	def build(cls, generation: int = 0) -> SuggestIndex:
+		items = frappe.get_all(
+			"Registry",
+			filters={"trust_status": "approved"},
+			fields=list(_ITEM_FIELDS),
+			limit_page_length=0,
+		)
+		return cls(items, load_tags(), generation)
+
+	def copy(self) -> SuggestIndex:
+		clone = SuggestIndex.__new__(SuggestIndex)
+		clone.__dict__.update(self.__dict__)
+		clone.ids = dict(self.ids)
+		clone.items = list(self.items)
+		clone.rank = self.rank.copy()
+		clone.item_tags = list(self.item_tags)
+		clone.item_keys = list(self.item_keys)
+		clone.keys = list(self.keys)
+		clone.tags = list(self.tags)
+		clone._memo = {}
+		return clone
+
+	def set(self, name: str, item: dict | None, tags: list[str] | None = None) -> None:
+		"""Replace one item's keys; ``None`` (or an unapproved item) removes it."""
+		pos = self.ids.get(name)
+		if pos is not None:
+			self._remove(pos)
+		if item is None or item.get("trust_status") != "approved":
+			return
+
+		if pos is None:
+			pos = self.ids[name] = len(self.items)
+			self.items.append(None)
+			self.rank = np.append(self.rank, 0.0)
+			self.item_tags.append(set())
+			self.item_keys.append(set())
+		self.items[pos] = _listing(item)
+		self.rank[pos] = _rank(item)
+		self.item_tags[pos] = _tag_keys(tags)
+		self.item_keys[pos] = _item_keys(item) | self.item_tags[pos]
+		self.max_keys = max(self.max_keys, len(self.item_keys[pos]))
+
+		keys = sorted(self.item_keys[pos])
+		at = [bisect_left(self.keys, key) for key in keys]
+		for i, key in sorted(zip(at, keys, strict=True), reverse=True):
+			self.keys.insert(i, key)
+		self.positions = np.insert(self.positions, at, pos).astype(np.int32)
+		self.entry_rank = np.insert(self.entry_rank, at, self.rank[pos])
+
+		for tag in self.item_tags[pos]:
+			i = bisect_left(self.tags, tag)
+			if i < len(self.tags) and self.tags[i] == tag:
+				self.tag_counts[i] += 1
+			else:
+				self.tags.insert(i, tag)
+				self.tag_counts = np.insert(self.tag_counts, i, 1).astype(np.int32)
+
+	def _remove(self, pos: int) -> None:
+		entries = []
+		for key in self.item_keys[pos]:
+			lo, hi = bisect_left(self.keys, key), bisect_right(self.keys, key)
+			entries += (lo + np.flatnonzero(self.positions[lo:hi] == pos)).tolist()
+		for i in sorted(entries, reverse=True):
+			del self.keys[i]
+		self.positions = np.delete(self.positions, entries)
+		self.entry_rank = np.delete(self.entry_rank, entries)
+
+		counts = self.tag_counts.copy()
+		for tag in self.item_tags[pos]:
+			counts[bisect_left(self.tags, tag)] -= 1
+		unused = np.flatnonzero(counts == 0).tolist()
+		for i in reversed(unused):
+			del self.tags[i]
+		self.tag_counts = np.delete(counts, unused)
+
+		self.items[pos] = None
+		self.item_tags[pos] = set()
+		self.item_keys[pos] = set()
+
+	def suggest(self, prefix: str, limit: int = 8) -> dict:
+		"""Top ``limit`` items and tags completing ``prefix`` (already normalized)."""
+		memo_key = (prefix, limit)
+		result = self._memo.get(memo_key)
+		if result is None:
+			result = {"items": self._items(prefix, limit), "tags": self._tags(prefix, limit)}
+			if len(self._memo) >= _MEMO_SIZE:
+				self._memo.clear()
+			self._memo[memo_key] = result
+		return result
+
+	def _items(self, prefix: str, limit: int) -> list[dict]:
+		lo, hi = _prefix_range(self.keys, prefix)
+		if lo == hi:
+			return []
+		# An item appears at most max_keys times in the range, so the best
+		# limit * max_keys entries always hold the best ``limit`` items.
+		candidates = limit * self.max_keys
+		if hi - lo > candidates:
+			entries = lo + np.argpartition(self.entry_rank[lo:hi], candidates - 1)[:candidates]
+		else:
+			entries = np.arange(lo, hi)
+		entries = entries[np.argsort(self.entry_rank[entries], kind="stable")]
+
+		result, seen = [], set()
+		for pos in self.positions[entries].tolist():
+			if pos not in seen:
+				seen.add(pos)
+				result.append(self.items[pos])
+				if len(result) == limit:
+					break
+		return result
+
+	def _tags(self, prefix: str, limit: int) -> list[dict]:
+		lo, hi = _prefix_range(self.tags, prefix)
+		if lo == hi:
+			return []
+		order = np.argsort(-self.tag_counts[lo:hi], kind="stable")[:limit]
+		return [{"tag": self.tags[lo + i], "count": int(self.tag_counts[lo + i])} for i in order.tolist()]
+
+
+def _listing(item: dict) -> dict:
+	return {field: item.get(field) for field in ("slug", "title", "item_type")}
+
+
+def _rank(item: dict) -> float:
+	return -(int(item.get("featured") or 0) * 1e12 + int(item.get("install_count") or 0))
+
+
+def _tag_keys(tags) -> set[str]:
+	return {normalize_query(tag) for tag in tags or [] if tag and tag.strip()}
+
+
+def _item_keys(item: dict) -> set[str]:
+	title = normalize_query(item.get("title"))
+	keys = {title, normalize_query(item.get("slug"))}
+	keys.update(title[match.start() :] for match in _WORD_START.finditer(title))
+	keys.discard("")
+	return keys
+
+
+def _prefix_range(keys: list[str], prefix: str) -> tuple[int, int]:
+	return bisect_left(keys, prefix), bisect_left(keys, prefix + "\uffff")
+
+
+_indexes = SiteIndexes(SuggestIndex.build, _GENERATION_KEY)
+
+
+def get_suggest_index() -> SuggestIndex:
+	"""Return this worker's suggest index for the current site, rebuilding if stale."""
+	return _indexes.get()
+
+
+def refresh_item(registry_name: str) -> None:
+	"""Publish a change to one Registry item once the transaction commits."""
+	frappe.db.after_commit.add(lambda: _apply_change(registry_name))
+
+
+def _apply_change(registry_name: str) -> None:
+	item = frappe.db.get_value("Registry", registry_name, list(_ITEM_FIELDS), as_dict=True)
+	tags = load_tags([registry_name]).get(registry_name, []) if item else None
+	_indexes.publish(lambda index: index.set(registry_name, item, tags))
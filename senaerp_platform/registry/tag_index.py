@@ -0,0 +1,145 @@
+"""Per-worker inverted index from tag to Registry items.
+
+Every Registry item gets a stable integer id; each (lower-cased) tag maps
+to a sorted int32 array of the ids carrying it. A multi-tag AND filter is
+the intersection of those arrays, computed smallest-first, so SQL search
+branches can restrict to ``r.name IN (...)`` before ranking and
+pagination instead of probing ``Registry Tag`` per candidate.
+
+It is the one tag index: SQL branches, facets and the vector index (which
+maps the names to its row positions) all filter through it.
+
+Kept in sync like the vector index (see site_index): saving or trashing a
+Registry doc bumps a Redis generation after commit, the saving worker
+patches a copy of its index and every other worker rebuilds on next use.
+"""
+
+from __future__ import annotations
+
+import frappe
+import numpy as np
+
+from senaerp_platform.registry.site_index import SiteIndexes
+
+
+_GENERATION_KEY = "registry_tag_index_generation"
+
+
+class TagIndex:
+	def __init__(self, item_tags: dict[str, list[str]], generation: int = 0):
+		self.generation = generation
+		# Ids are append-only; a removed item keeps its slot but leaves every posting.
+		self.names: list[str] = list(item_tags)
+		self.ids = {name: i for i, name in enumerate(self.names)}
+		self.item_tags = {name: normalize_tags(tags) for name, tags in item_tags.items()}
+
+		postings: dict[str, list[int]] = {}
+		for name, tags in self.item_tags.items():
+			for tag in tags:
+				postings.setdefault(tag, []).append(self.ids[name])
+		self.postings = {tag: np.asarray(ids, dtype=np.int32) for tag, ids in postings.items()}
+
+	@classmethod
+	def build(cls, generation: int = 0) -> TagIndex:
+		item_tags = load_tags()
+		names = frappe.get_all("Registry", pluck="name", order_by="name asc", limit_page_length=0)
+		return cls({name: item_tags.get(name, []) for name in names}, generation)
+
+	def copy(self) -> TagIndex:
+		clone = TagIndex.__new__(TagIndex)
+		clone.generation = self.generation
+		clone.names = list(self.names)
+		clone.ids = dict(self.ids)
+		clone.item_tags = dict(self.item_tags)
+		clone.postings = dict(self.postings)
+		return clone
+
+	def names_with(self, tags: list[str]) -> list[str]:
+		"""Names of the items carrying every one of ``tags``."""
+		tags = normalize_tags(tags)
+		if not tags:
+			return [name for name in self.names if name in self.item_tags]
+
+		postings = sorted((self.postings.get(tag) for tag in tags), key=lambda p: -1 if p is None else len(p))
+		if postings[0] is None:
+			return []
+		result = postings[0]
+		for posting in postings[1:]:
+			result = np.intersect1d(result, posting, assume_unique=True)
+			if not len(result):
+				break
+		return [self.names[i] for i in result.tolist()]
+
+	def set(self, name: str, tags: list[str] | None) -> None:
+		"""Replace an item's tags; ``None`` removes the item."""
+		for tag in self.item_tags.pop(name, []):
+			posting = self.postings[tag]
+			posting = posting[posting != self.ids[name]]
+			if len(posting):
+				self.postings[tag] = posting
+			else:
+				del self.postings[tag]
+
+		if tags is None:
+			return
+
+		if name not in self.ids:
+			self.ids[name] = len(self.names)
+			self.names.append(name)
+		item_id = self.ids[name]
+		self.item_tags[name] = normalize_tags(tags)
+		for tag in self.item_tags[name]:
+			posting = self.postings.get(tag, np.empty(0, np.int32))
+			at = np.searchsorted(posting, item_id)
+			self.postings[tag] = np.insert(posting, at, item_id).astype(np.int32)
+
+
+def normalize_tags(tags) -> list[str]:
+	"""Distinct, stripped, lower-cased tags in sorted order."""
+	return sorted({t.strip().lower() for t in tags or [] if t and t.strip()})
+
+
+def load_tags(names: list[str] | None = None) -> dict[str, list[str]]:
+	"""Registry name -> tags in row order, for all or the given items, in one query."""
+	filters = {"parenttype": "Registry"}
+	if names is not None:
+		if not names:
+			return {}
+		filters["parent"] = ["in", list(set(names))]
+
+	tags: dict[str, list[str]] = {}
+	for row in frappe.get_all(
+		"Registry Tag",
+		filters=filters,
+		fields=["parent", "tag"],
+		order_by="idx asc",
+		limit_page_length=0,
+	):
+		tags.setdefault(row.parent, []).append(row.tag)
+	return tags
+
+
+_indexes = SiteIndexes(TagIndex.build, _GENERATION_KEY)
+
+
+def get_tag_index() -> TagIndex:
+	"""Return this worker's tag index for the current site, rebuilding if stale."""
+	return _indexes.get()
+
+
+def names_with_tags(tags: list[str] | None) -> list[str] | None:
+	"""Registry names carrying all ``tags``, or None when no tag filter applies."""
+	if not normalize_tags(tags):
+		return None
+	return get_tag_index().names_with(tags)
+
+
+def refresh_item(registry_name: str) -> None:
+	"""Publish a change to one Registry item's tags once the transaction commits."""
+	frappe.db.after_commit.add(lambda: _apply_change(registry_name))
+
+
+def _apply_change(registry_name: str) -> None:
+	exists = frappe.db.exists("Registry", registry_name)
+	tags = load_tags([registry_name]).get(registry_name, []) if exists else None
+	_indexes.publish(lambda index: index.set(registry_name, tags))
@@ -0,0 +1,49 @@
+import unittest
+
+import numpy as np
+
+from senaerp_platform.registry.ann import IVFIndex, normalize_rows
+from senaerp_platform.registry.quantization import QuantizedMatrix
+
+
+class TestIVFIndex(unittest.TestCase):
+	def setUp(self):
+		rng = np.random.default_rng(0)
+		# Four well separated clusters
+		centers = normalize_rows(rng.normal(size=(4, 8)))
+		self.matrix = normalize_rows(np.repeat(centers, 50, axis=0) + rng.normal(scale=0.05, size=(200, 8)))
+		self.index = IVFIndex.train(self.matrix, n_lists=4)
+
+	def test_every_row_is_assigned(self):
+		self.assertEqual(self.index.n_lists, 4)
+		self.assertEqual(len(self.index.assignments), 200)
+		self.assertTrue(set(self.index.assignments.tolist()) <= set(range(4)))
+		# Default: sqrt(n) lists
+		self.assertEqual(IVFIndex.train(self.matrix).n_lists, 14)
+
+	def test_probing_every_list_is_exhaustive(self):
+		query = self.matrix[0]
+		np.testing.assert_array_equal(self.index.candidates(query, nprobe=4), np.arange(200))
+		# More probes than lists are capped
+		np.testing.assert_array_equal(self.index.candidates(query, nprobe=10), np.arange(200))
+
+	def test_probes_the_closest_lists(self):
+		query = self.matrix[60]
+		closest = np.argsort(-(self.index.centroids @ query))
+		for nprobe in (1, 2):
+			expected = np.flatnonzero(np.isin(self.index.assignments, closest[:nprobe]))
+			np.testing.assert_array_equal(self.index.candidates(query, nprobe), expected)
+		# A row is always in the list closest to itself
+		self.assertIn(60, self.index.candidates(query, nprobe=1))
+
+	def test_add_assigns_appended_rows(self):
+		self.index.add(self.matrix[[10, 110]])
+		self.assertEqual(len(self.index.assignments), 202)
+		self.assertEqual(self.index.assignments[200], self.index.assignments[10])
+		self.assertEqual(self.index.assignments[201], self.index.assignments[110])
+
+	def test_trains_on_a_quantized_matrix(self):
+		index = IVFIndex.train(QuantizedMatrix.from_float(self.matrix), n_lists=4)
+		np.testing.assert_array_equal(
+			np.bincount(index.assignments, minlength=4), np.bincount(self.index.assignments, minlength=4)
+		)
@@ -0,0 +1,49 @@
+import base64
+import json
+import unittest
+
+import frappe
+
+from senaerp_platform.registry.api import _SORT_KEYS, _decode_cursor, _encode_cursor, _seek_condition
+
+
+def _cursor(payload):
+	return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+class TestCursorPagination(unittest.TestCase):
+	def test_seek_condition_expands_each_sort_key(self):
+		condition, values = _seek_condition(_SORT_KEYS["alpha"], ["Gmail", "REG-1"])
+		self.assertEqual(
+			condition, "(r.`title` > %(cursor_0)s OR (r.`title` = %(cursor_0)s AND r.`name` > %(cursor_1)s))"
+		)
+		self.assertEqual(values, {"cursor_0": "Gmail", "cursor_1": "REG-1"})
+
+	def test_seek_condition_follows_direction(self):
+		condition, values = _seek_condition(_SORT_KEYS["featured"], [1, "2026-01-01 00:00:00", "REG-1"])
+		self.assertEqual(
+			condition,
+			"(r.`featured` < %(cursor_0)s OR (r.`featured` = %(cursor_0)s AND "
+			"(r.`modified` < %(cursor_1)s OR (r.`modified` = %(cursor_1)s AND r.`name` < %(cursor_2)s))))",
+		)
+		self.assertEqual(len(values), 3)
+
+	def test_cursor_round_trip(self):
+		cursor = _encode_cursor("popular", 120, [42, "REG-7"])
+		self.assertNotIn("=", cursor)
+		self.assertEqual(_decode_cursor(cursor, "popular"), (120, [42, "REG-7"]))
+		self.assertEqual(_decode_cursor(_cursor(["alpha", 3, None, "REG-1"]), "alpha"), (3, [None, "REG-1"]))
+
+	def test_invalid_cursors_are_rejected(self):
+		for cursor in (
+			"not base64!",
+			_cursor({"sort_by": "popular"}),
+			_cursor(["popular", 120, 42]),
+			_cursor(["alpha", 120, 42, "REG-7"]),
+			_cursor(["popular", "120", 42, "REG-7"]),
+			_cursor(["popular", 120, True, "REG-7"]),
+			_cursor(["popular", 120, {"a": 1}, "REG-7"]),
+			_cursor(["popular", 120, 42, ["REG-7"]]),
+		):
+			with self.assertRaises(frappe.ValidationError, msg=cursor):
+				_decode_cursor(cursor, "popular")
@@ -0,0 +1,23 @@
+import unittest
+
+from senaerp_platform.registry.embedding import reciprocal_rank_fusion
+
+
+class TestReciprocalRankFusion(unittest.TestCase):
+	def test_items_found_by_both_rankings_come_first(self):
+		fused = reciprocal_rank_fusion({"semantic": ["a", "b", "c"], "fulltext": ["c", "d", "a"]})
+		self.assertEqual(fused, ["a", "c", "b", "d"])
+
+	def test_scores_follow_the_formula(self):
+		# a: 1/(1+1) + 1/(1+2) = 0.83; c: 1/(1+3) + 1/(1+1) = 0.75; b: 1/(1+2) = 0.33
+		fused = reciprocal_rank_fusion({"semantic": ["a", "b", "c"], "fulltext": ["c", "a"]}, k=1)
+		self.assertEqual(fused, ["a", "c", "b"])
+
+	def test_weights_favour_a_source(self):
+		rankings = {"semantic": ["a", "b"], "fulltext": ["b", "a"]}
+		self.assertEqual(reciprocal_rank_fusion(rankings, weights={"fulltext": 2})[0], "b")
+		self.assertEqual(reciprocal_rank_fusion(rankings, weights={"semantic": "2.0"})[0], "a")
+
+	def test_empty_rankings(self):
+		self.assertEqual(reciprocal_rank_fusion({"semantic": [], "fulltext": []}), [])
+		self.assertEqual(reciprocal_rank_fusion({"semantic": [], "fulltext": ["a"]}), ["a"])
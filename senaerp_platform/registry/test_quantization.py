@@ -0,0 +1,48 @@
+import unittest
+
+import numpy as np
+
+from senaerp_platform.registry.quantization import QuantizedMatrix
+
+
+class TestQuantizedMatrix(unittest.TestCase):
+	def setUp(self):
+		rng = np.random.default_rng(0)
+		self.matrix = rng.normal(size=(50, 16)).astype(np.float32)
+		self.quantized = QuantizedMatrix.from_float(self.matrix)
+
+	def test_round_trip_error_is_within_half_a_step(self):
+		step = np.abs(self.matrix).max(axis=1, keepdims=True) / 127
+		self.assertTrue(np.all(np.abs(np.asarray(self.quantized) - self.matrix) <= step / 2 + 1e-6))
+		self.assertEqual(self.quantized.shape, (50, 16))
+		self.assertEqual(self.quantized.nbytes, 50 * 16 + 50 * 4)
+
+	def test_matmul_matches_dequantized_product(self):
+		query = np.random.default_rng(1).normal(size=16).astype(np.float32)
+		np.testing.assert_allclose(self.quantized @ query, np.asarray(self.quantized) @ query, rtol=1e-5)
+		centroids = self.matrix[:3].T
+		self.assertEqual((self.quantized @ centroids).shape, (50, 3))
+
+	def test_row_access_and_assignment(self):
+		row = self.quantized[4]
+		self.assertIsInstance(row, QuantizedMatrix)
+		self.assertEqual(len(row), 1)
+		self.assertEqual(len(self.quantized[np.array([1, 3, 5])]), 3)
+
+		self.quantized[4] = self.matrix[7]
+		np.testing.assert_array_equal(self.quantized[4].codes, self.quantized[7].codes)
+
+	def test_append_and_copy(self):
+		extra = QuantizedMatrix.from_float(self.matrix[:2])
+		grown = self.quantized.append(extra).append(self.matrix[:1])
+		self.assertEqual(len(grown), 53)
+		np.testing.assert_array_equal(grown[50].codes, grown[0].codes)
+		np.testing.assert_array_equal(grown[52].codes, grown[0].codes)
+
+		clone = self.quantized.copy()
+		clone[0] = self.matrix[1]
+		self.assertFalse(np.array_equal(clone[0].codes, self.quantized[0].codes))
+
+	def test_zero_rows_stay_zero(self):
+		quantized = QuantizedMatrix.from_float(np.zeros((2, 4), dtype=np.float32))
+		np.testing.assert_array_equal(np.asarray(quantized), np.zeros((2, 4)))
@@ -0,0 +1,71 @@
+import unittest
+
+from senaerp_platform.registry.suggest_index import SuggestIndex
+
+
+def _item(name, title, featured=0, install_count=0, **fields):
+	return {
+		"name": name,
+		"slug": name,
+		"title": title,
+		"item_type": "Tool",
+		"trust_status": "approved",
+		"featured": featured,
+		"install_count": install_count,
+		**fields,
+	}
+
+
+def _slugs(result):
+	return [item["slug"] for item in result["items"]]
+
+
+class TestSuggestIndex(unittest.TestCase):
+	def setUp(self):
+		self.index = SuggestIndex(
+			[
+				_item("github-issues", "Sync GitHub Issues", install_count=10),
+				_item("gitlab", "GitLab CI", install_count=50),
+				_item("gmail", "Gmail", featured=1),
+			],
+			{"github-issues": ["git", "Issues"], "gitlab": ["git", "ci"]},
+		)
+
+	def test_prefix_matches_title_words_slug_and_tags(self):
+		self.assertEqual(_slugs(self.index.suggest("github")), ["github-issues"])
+		self.assertEqual(_slugs(self.index.suggest("sync g")), ["github-issues"])
+		self.assertEqual(_slugs(self.index.suggest("issues")), ["github-issues"])
+		self.assertEqual(_slugs(self.index.suggest("ci")), ["gitlab"])
+		self.assertEqual(self.index.suggest("zz"), {"items": [], "tags": []})
+
+	def test_featured_then_most_installed(self):
+		self.assertEqual(_slugs(self.index.suggest("g")), ["gmail", "gitlab", "github-issues"])
+		self.assertEqual(_slugs(self.index.suggest("g", limit=2)), ["gmail", "gitlab"])
+
+	def test_tag_completions_by_usage(self):
+		self.assertEqual(self.index.suggest("g")["tags"], [{"tag": "git", "count": 2}])
+		self.assertEqual(self.index.suggest("i")["tags"], [{"tag": "issues", "count": 1}])
+
+	def test_items_carry_listing_fields_only(self):
+		self.assertEqual(
+			self.index.suggest("gmail")["items"], [{"slug": "gmail", "title": "Gmail", "item_type": "Tool"}]
+		)
+
+	def test_set_matches_a_fresh_build(self):
+		patched = self.index.copy()
+		patched.set("gitlab", _item("gitlab", "GitLab Runner", install_count=5), ["runner"])
+		patched.set("gmail", _item("gmail", "Gmail", trust_status="rejected"), [])
+		patched.set("grafana", _item("grafana", "Grafana Dashboards", featured=1), ["git"])
+
+		fresh = SuggestIndex(
+			[
+				_item("github-issues", "Sync GitHub Issues", install_count=10),
+				_item("gitlab", "GitLab Runner", install_count=5),
+				_item("grafana", "Grafana Dashboards", featured=1),
+			],
+			{"github-issues": ["git", "Issues"], "gitlab": ["runner"], "grafana": ["git"]},
+		)
+		for prefix in ("g", "git", "gm", "ci", "run", "dash", "i"):
+			self.assertEqual(patched.suggest(prefix), fresh.suggest(prefix), prefix)
+		# The original is untouched
+		self.assertEqual(_slugs(self.index.suggest("gm")), ["gmail"])
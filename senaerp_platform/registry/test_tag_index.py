@@ -0,0 +1,42 @@
+import unittest
+
+from senaerp_platform.registry.tag_index import TagIndex, normalize_tags
+
+
+class TestTagIndex(unittest.TestCase):
+	def setUp(self):
+		self.index = TagIndex(
+			{
+				"gmail": ["Email", "google"],
+				"outlook": ["email", "Microsoft "],
+				"drive": ["google", "files"],
+				"plain": [],
+			}
+		)
+
+	def test_normalize_tags(self):
+		self.assertEqual(normalize_tags([" Email", "email", "", None, "Files"]), ["email", "files"])
+
+	def test_names_with_intersects_all_tags(self):
+		self.assertEqual(self.index.names_with(["email"]), ["gmail", "outlook"])
+		self.assertEqual(self.index.names_with(["EMAIL", "google"]), ["gmail"])
+		self.assertEqual(self.index.names_with(["email", "files"]), [])
+		self.assertEqual(self.index.names_with(["unknown", "email"]), [])
+
+	def test_no_tags_matches_every_item(self):
+		self.assertEqual(self.index.names_with([]), ["gmail", "outlook", "drive", "plain"])
+
+	def test_set_patches_a_copy(self):
+		patched = self.index.copy()
+		patched.set("plain", ["Email"])
+		patched.set("gmail", ["files"])
+		patched.set("slack", ["chat", "email"])
+		patched.set("drive", None)
+
+		self.assertEqual(patched.names_with(["email"]), ["outlook", "plain", "slack"])
+		self.assertEqual(patched.names_with(["files"]), ["gmail"])
+		self.assertEqual(patched.names_with(["google"]), [])
+		self.assertEqual(patched.names_with([]), ["gmail", "outlook", "plain", "slack"])
+		# The original is untouched
+		self.assertEqual(self.index.names_with(["email"]), ["gmail", "outlook"])
+		self.assertEqual(self.index.names_with(["google"]), ["gmail", "drive"])
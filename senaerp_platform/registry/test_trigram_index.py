@@ -0,0 +1,58 @@
+import unittest
+
+from senaerp_platform.registry.trigram_index import TrigramIndex, trigrams
+
+
+def _item(name, title, **fields):
+	return {"name": name, "title": title, "slug": name, "trust_status": "approved", **fields}
+
+
+class TestTrigramIndex(unittest.TestCase):
+	def setUp(self):
+		self.index = TrigramIndex(
+			[
+				_item("gmail", "Gmail Sync", item_type="Tool"),
+				_item("gmail-labels", "Gmail Labels Manager", item_type="Skill"),
+				_item("slack", "Slack Notifier", item_type="Tool", trust_status="pending"),
+			],
+			{"slack": ["messaging"]},
+		)
+
+	def test_trigrams_pad_each_word(self):
+		self.assertEqual(trigrams("Go"), {"  g", " go", "go "})
+		self.assertEqual(trigrams("a b"), trigrams("b a"))
+
+	def test_misspelling_matches(self):
+		self.assertEqual(self.index.ranking("gmial"), ["gmail", "gmail-labels"])
+		self.assertEqual(self.index.ranking("slak notifer"), ["slack"])
+		self.assertEqual(self.index.ranking("messagin"), ["slack"])
+		self.assertEqual(self.index.ranking("zzzz"), [])
+
+	def test_closer_matches_rank_first(self):
+		# Both contain all of "gmail"; the shorter source is the closer match
+		self.assertEqual(self.index.ranking("gmail")[0], "gmail")
+		self.assertEqual(self.index.ranking("gmail labels")[0], "gmail-labels")
+
+	def test_filters_and_threshold(self):
+		self.assertEqual(self.index.ranking("gmial", {"item_type": "Skill"}), ["gmail-labels"])
+		self.assertEqual(self.index.ranking("slack", {"trust_status": "approved"}), [])
+		self.assertEqual(self.index.ranking("gmial", threshold=0.9), [])
+
+	def test_set_matches_a_fresh_build(self):
+		patched = self.index.copy()
+		patched.set("gmail", _item("gmail", "Google Mail"), ["email"])
+		patched.set("slack", None)
+		patched.set("teams", _item("teams", "Teams Notifier"), ["messaging"])
+
+		fresh = TrigramIndex(
+			[
+				_item("gmail", "Google Mail"),
+				_item("gmail-labels", "Gmail Labels Manager", item_type="Skill"),
+				_item("teams", "Teams Notifier"),
+			],
+			{"gmail": ["email"], "teams": ["messaging"]},
+		)
+		for query in ("gmial", "google", "notifer", "messaging", "slack", "emial"):
+			self.assertEqual(patched.ranking(query), fresh.ranking(query), query)
+		# The original is untouched
+		self.assertEqual(self.index.ranking("slack"), ["slack"])
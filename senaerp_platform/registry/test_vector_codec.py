@@ -0,0 +1,31 @@
+import json
+import unittest
+
+import numpy as np
+
+from senaerp_platform.registry.vector_codec import decode_embedding, encode_embedding, is_legacy
+
+
+class TestVectorCodec(unittest.TestCase):
+	def test_float32_round_trip(self):
+		vector = np.random.default_rng(0).normal(size=32).astype(np.float32)
+		encoded = encode_embedding(vector)
+		self.assertTrue(encoded.startswith("f4:"))
+		np.testing.assert_array_equal(decode_embedding(encoded), vector)
+
+	def test_float16_round_trip(self):
+		vector = np.random.default_rng(0).normal(size=32)
+		encoded = encode_embedding(vector, "float16")
+		self.assertTrue(encoded.startswith("f2:"))
+		decoded = decode_embedding(encoded)
+		self.assertEqual(decoded.dtype, np.float32)
+		np.testing.assert_allclose(decoded, vector, rtol=1e-3, atol=1e-3)
+
+	def test_legacy_json(self):
+		value = json.dumps([0.5, -1.0, 2.0])
+		self.assertTrue(is_legacy(value))
+		np.testing.assert_array_equal(decode_embedding(value), [0.5, -1.0, 2.0])
+
+	def test_unreadable_values_decode_to_none(self):
+		for value in (None, "", "[]", "[[1, 2]]", "[not json", "x9:AAAA", "f4:", "f4:not base64!"):
+			self.assertIsNone(decode_embedding(value), value)
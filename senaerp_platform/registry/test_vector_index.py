@@ -0,0 +1,118 @@
+import unittest
+
+import numpy as np
+
+from senaerp_platform.registry.vector_index import VectorIndex
+
+
+def _row(name, **fields):
+	return {"name": name, "trust_status": "approved", "category": "mail", "featured": 0, **fields}
+
+
+def _names(index, hits):
+	return [index.names[pos] for pos, _ in hits]
+
+
+class TestVectorIndex(unittest.TestCase):
+	def setUp(self):
+		self.vectors = {
+			"a": [1.0, 0.0, 0.0],
+			"b": [0.8, 0.6, 0.0],
+			"c": [0.0, 1.0, 0.0],
+			"d": [0.0, 0.0, 1.0],
+		}
+		self.rows = [
+			_row("a"),
+			_row("b", category="chat"),
+			_row("c", featured=1),
+			_row("d", trust_status="pending", author="x"),
+		]
+		self.index = VectorIndex(self.rows, [self.vectors[row["name"]] for row in self.rows])
+
+	def ranked(self, index, query, filters=None, **kwargs):
+		hits, total, _ = index.ranked(query, filters, limit=10, exact=True, **kwargs)
+		return _names(index, hits), total
+
+	def test_ranks_by_cosine_similarity(self):
+		hits, total, exact = self.index.ranked([2.0, 0.0, 0.0], limit=2)
+		self.assertEqual(_names(self.index, hits), ["a", "b"])
+		self.assertAlmostEqual(hits[1][1], 0.8, places=5)
+		self.assertEqual(total, 4)
+		self.assertTrue(exact)
+
+	def test_threshold_counts_matches(self):
+		self.assertEqual(self.ranked(self.index, [1.0, 0.0, 0.0], threshold=0.5), (["a", "b"], 2))
+
+	def test_filter_masks(self):
+		query = [1.0, 2.0, 3.0]
+		self.assertEqual(self.ranked(self.index, query, {"category": "mail"})[0], ["d", "c", "a"])
+		self.assertEqual(self.ranked(self.index, query, {"category": "mail", "featured": 1})[0], ["c"])
+		self.assertEqual(self.ranked(self.index, query, {"trust_status": "rejected"})[0], [])
+		# Fields without a bitmap are checked row by row
+		self.assertEqual(self.ranked(self.index, query, {"author": "x"})[0], ["d"])
+
+	def test_wrong_dimension_or_empty_query(self):
+		self.assertEqual(self.index.ranked([1.0, 0.0]), ([], 0, True))
+		self.assertEqual(self.index.ranked([0.0, 0.0, 0.0]), ([], 0, True))
+		self.assertEqual(VectorIndex([], []).ranked([1.0]), ([], 0, True))
+
+	def test_upsert_and_remove_leave_the_matrix_alone(self):
+		patched = self.index.copy()
+		patched.upsert(_row("a", category="chat"), [0.0, 0.3, 0.95])
+		patched.upsert(_row("e"), [0.6, 0.8, 0.0])
+		patched.remove("c")
+		patched.remove("missing")
+
+		self.assertIs(patched.matrix, self.index.matrix)
+		self.assertEqual(len(patched), 4)
+		self.assertEqual(self.ranked(patched, [0.0, 1.0, 0.0])[0], ["e", "b", "a", "d"])
+		self.assertEqual(self.ranked(patched, [0.0, 0.0, 1.0], {"category": "chat"})[0], ["a", "b"])
+		# The original is untouched
+		self.assertEqual(self.ranked(self.index, [0.0, 1.0, 0.0], threshold=0.5)[0], ["c", "b"])
+
+	def test_overlay_rows_are_replaced_in_place(self):
+		patched = self.index.copy()
+		patched.upsert(_row("e"), [1.0, 0.0, 0.0])
+		patched.upsert(_row("e", featured=1), [0.0, 0.8, 0.6])
+		self.assertEqual(len(patched.overlay), 1)
+		self.assertEqual(self.ranked(patched, [0.0, 1.0, 0.0], {"featured": 1})[0], ["c", "e"])
+
+	def test_compacted_matches_a_fresh_build(self):
+		rng = np.random.default_rng(0)
+		for quantization in (None, "int8"):
+			rows = [_row(f"i{i}", featured=i % 2) for i in range(40)]
+			vectors = {row["name"]: rng.normal(size=8) for row in rows}
+			index = VectorIndex(rows, list(vectors.values()), quantization=quantization)
+			for step in range(30):
+				name = f"i{rng.integers(50)}"
+				if step % 3 == 0:
+					index.remove(name)
+					vectors.pop(name, None)
+				else:
+					vectors[name] = rng.normal(size=8)
+					index.upsert(_row(name, featured=step % 2), vectors[name])
+
+			compacted = index.compacted()
+			self.assertIsNone(compacted.overlay)
+			self.assertIsNone(compacted.live)
+			ordered = [vectors[name] for name in compacted.names]
+			fresh = VectorIndex(compacted.rows, ordered, quantization=quantization)
+			for filters in (None, {"featured": 1}):
+				query = rng.normal(size=8)
+				self.assertEqual(self.ranked(index, query, filters), self.ranked(fresh, query, filters))
+				self.assertEqual(self.ranked(compacted, query, filters), self.ranked(fresh, query, filters))
+
+	def test_ann_and_overlay_are_scored_together(self):
+		rng = np.random.default_rng(1)
+		rows = [_row(f"i{i}") for i in range(400)]
+		index = VectorIndex(rows, rng.normal(size=(400, 8)), ann_min_items=100, nprobe=40)
+		self.assertIsNotNone(index.ann)
+
+		patched = index.copy()
+		query = rng.normal(size=8)
+		patched.upsert(_row("new"), query)
+		patched.remove("i0")
+		hits, _, exact = patched.ranked(query, limit=5)
+		self.assertFalse(exact)
+		self.assertEqual(_names(patched, hits)[0], "new")
+		self.assertNotIn("i0", _names(patched, patched.ranked(query, limit=400)[0]))
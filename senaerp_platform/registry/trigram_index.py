@@ -0,0 +1,182 @@
+"""Per-worker trigram index for typo-tolerant registry search.
+
+Every Registry item is broken into the character trigrams of the words in
+its title, slug and tags, each word padded as "  word " (as pg_trgm does),
+so a misspelling like "gmial" still shares a third of its trigrams with
+"gmail". Each trigram maps to a sorted array of item positions; a query
+counts, with one ``bincount`` over the postings of its own trigrams, how
+many it shares with every item. Only items sharing at least one trigram are
+ever touched; there is no scan over the catalog.
+
+Items are ranked by the share of the query's trigrams they contain, ties
+broken by trigram Jaccard similarity (closer, shorter matches first).
+Those below ``registry_trigram_threshold`` (default 0.3) are dropped.
+
+Kept in sync like the tag index (see site_index): saving or trashing a
+Registry doc bumps this index's own Redis generation after commit, the
+saving worker patches a copy of its index and every other worker
+rebuilds on next use. Writes to other doctypes leave it alone.
+"""
+
+from __future__ import annotations
+
+import re
+
+import frappe
+import numpy as np
+
+from senaerp_platform.registry.embedding_cache import normalize_query
+from senaerp_platform.registry.site_index import SiteIndexes
+from senaerp_platform.registry.tag_index import load_tags, names_with_tags
+
+
+_GENERATION_KEY = "registry_trigram_index_generation"
+_ITEM_FIELDS = ("name", "slug", "title", "trust_status", "item_type", "category", "featured")
+_FILTER_FIELDS = ("trust_status", "item_type", "category", "featured")
+_WORD = re.compile(r"\w+")
+_THRESHOLD = 0.3
+
+
+def trigrams(text: str | None) -> set[str]:
+	"""Trigrams of every word in ``text``, lower-cased and padded."""
+	grams = set()
+	for word in _WORD.findall(normalize_query(text)):
+		padded = f"  {word} "
+		grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+	return grams
+
+
+class TrigramIndex:
+	def __init__(self, items: list[dict], item_tags: dict[str, list[str]], generation: int = 0):
+		self.generation = generation
+		# Positions are append-only; a removed item keeps its slot but leaves every posting.
+		self.names = [item["name"] for item in items]
+		self.ids = {name: pos for pos, name in enumerate(self.names)}
+		self.filters = [{field: item.get(field) for field in _FILTER_FIELDS} for item in items]
+		# Title, slug and tags per item, to find its postings again when it changes
+		self.sources = [_source(item, item_tags.get(item["name"])) for item in items]
+
+		postings: dict[str, list[int]] = {}
+		sizes = []
+		for pos, source in enumerate(self.sources):
+			grams = _source_trigrams(source)
+			sizes.append(len(grams))
+			for gram in grams:
+				postings.setdefault(gram, []).append(pos)
+		self.sizes = np.array(sizes, dtype=np.int32)
+		self.postings = {gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()}
+
+	def __len__(self) -> int:
+		return len(self.names)
+
+	@classmethod
+	def build(cls, generation: int = 0) -> TrigramIndex:
+		items = frappe.get_all("Registry", fields=list(_ITEM_FIELDS), limit_page_length=0)
+		return cls(items, load_tags(), generation)
+
+	def copy(self) -> TrigramIndex:
+		clone = TrigramIndex.__new__(TrigramIndex)
+		clone.generation = self.generation
+		clone.names = list(self.names)
+		clone.ids = dict(self.ids)
+		clone.filters = list(self.filters)
+		clone.sources = list(self.sources)
+		clone.sizes = self.sizes.copy()
+		clone.postings = dict(self.postings)
+		return clone
+
+	def set(self, name: str, item: dict | None, tags: list[str] | None = None) -> None:
+		"""Replace one item's trigrams and filter fields; ``None`` removes it."""
+		pos = self.ids.get(name)
+		if pos is not None:
+			for gram in _source_trigrams(self.sources[pos]):
+				posting = self.postings[gram]
+				posting = posting[posting != pos]
+				if len(posting):
+					self.postings[gram] = posting
+				else:
+					del self.postings[gram]
+			self.sources[pos] = ()
+			self.sizes[pos] = 0
+		if item is None:
+			return
+
+		if pos is None:
+			pos = self.ids[name] = len(self.names)
+			self.names.append(name)
+			self.filters.append({})
+			self.sources.append(())
+			self.sizes = np.append(self.sizes, 0).astype(np.int32)
+		self.filters[pos] = {field: item.get(field) for field in _FILTER_FIELDS}
+		self.sources[pos] = _source(item, tags)
+		grams = _source_trigrams(self.sources[pos])
+		self.sizes[pos] = len(grams)
+		for gram in grams:
+			posting = self.postings.get(gram, np.empty(0, np.int32))
+			self.postings[gram] = np.insert(posting, np.searchsorted(posting, pos), pos).astype(np.int32)
+
+	def ranking(self, query: str, filters: dict | None = None, threshold: float = _THRESHOLD) -> list[str]:
+		"""Names of items similar to ``query`` and matching ``filters``, best first."""
+		grams = trigrams(query)
+		hits = [self.postings[gram] for gram in grams if gram in self.postings]
+		if not hits:
+			return []
+
+		shared = np.bincount(np.concatenate(hits), minlength=len(self))
+		candidates = np.flatnonzero(shared)
+		shared = shared[candidates]
+		similarity = shared / len(grams)
+		keep = similarity >= threshold
+		candidates, shared, similarity = candidates[keep], shared[keep], similarity[keep]
+
+		jaccard = shared / (len(grams) + self.sizes[candidates] - shared)
+		order = np.lexsort((-jaccard, -similarity))
+		names = []
+		for pos in candidates[order].tolist():
+			if all(self.filters[pos][field] == value for field, value in (filters or {}).items()):
+				names.append(self.names[pos])
+		return names
+
+
+def _source(item: dict, tags: list[str] | None) -> tuple[str, ...]:
+	return (item.get("title") or "", item.get("slug") or "", *(tags or []))
+
+
+def _source_trigrams(source: tuple[str, ...]) -> set[str]:
+	grams = set()
+	for text in source:
+		grams |= trigrams(text)
+	return grams
+
+
+_indexes = SiteIndexes(TrigramIndex.build, _GENERATION_KEY)
+
+
+def get_trigram_index() -> TrigramIndex:
+	"""Return this worker's trigram index for the current site, rebuilding if stale."""
+	return _indexes.get()
+
+
+def trigram_ranking(query: str, filters: dict | None = None, tags: list[str] | None = None) -> list[str]:
+	"""Names of items whose title, slug or tags resemble ``query``, best first.
+
+	Only items matching ``filters`` and carrying all ``tags`` are returned.
+	"""
+	threshold = float(frappe.conf.get("registry_trigram_threshold") or _THRESHOLD)
+	names = get_trigram_index().ranking(query, filters, threshold)
+	tag_names = names_with_tags(tags)
+	if tag_names is not None:
+		tag_names = set(tag_names)
+		names = [name for name in names if name in tag_names]
+	return names
+
+
+def refresh_item(registry_name: str) -> None:
+	"""Publish a change to one Registry item once the transaction commits."""
+	frappe.db.after_commit.add(lambda: _apply_change(registry_name))
+
+
+def _apply_change(registry_name: str) -> None:
+	item = frappe.db.get_value("Registry", registry_name, list(_ITEM_FIELDS), as_dict=True)
+	tags = load_tags([registry_name]).get(registry_name, []) if item else None
+	_indexes.publish(lambda index: index.set(registry_name, item, tags))
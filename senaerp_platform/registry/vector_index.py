@@ -0,0 +1,592 @@
+"""Per-worker in-memory vector index for registry semantic search.
+
+Holds every embedded Registry item as one row of an L2-normalized matrix
+(int8-quantized by default, see quantization.py) together with its listing
+fields, so a query is scored with a single matrix-vector product instead
+of decoding and comparing each row in Python.
+
+Workers share a generation counter in Redis. Saving or trashing a Registry
+doc bumps it after commit: the worker that made the change patches its own
+index, every other worker rebuilds on its next search. The matrix itself
+is never written to: changed and added rows go to a small private overlay
+that is scored next to it, and the rows they replace are masked out.
+
+A full build also writes its matrix to index_store as a snapshot, stamped
+with a watermark (the newest Registry Search Index ``modified``). A worker
+that needs an index memory-maps the current snapshot and only loads the
+embeddings modified since its watermark, instead of decoding every row;
+the matrix pages are shared by all workers on the host. Single-item
+patches are never written; ``snapshot()`` merges them into a new file after
+``rebuild_search_index``, hourly and on migrate, so the first search after
+a deploy or worker restart is as cheap as any other.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from datetime import timedelta
+
+import frappe
+import numpy as np
+from frappe.utils import cint, get_datetime
+
+from senaerp_platform.registry import index_store
+from senaerp_platform.registry.ann import IVFIndex, normalize_rows
+from senaerp_platform.registry.bitmaps import BitmapIndex
+from senaerp_platform.registry.quantization import QuantizedMatrix
+from senaerp_platform.registry.site_index import SiteIndexes
+from senaerp_platform.registry.tag_index import names_with_tags
+from senaerp_platform.registry.vector_codec import decode_embedding
+
+
+_GENERATION_KEY = "registry_vector_index_generation"
+
+# Below this many (candidate) rows exact scoring is cheaper than probing.
+_ANN_MIN_ITEMS = 5000
+_ANN_NPROBE = 8
+
+# Int8 matrices: the best this many first-pass hits are rescored at full precision.
+_QUANTIZATION = "int8"
+_RESCORE = 50
+
+# Embeddings modified this long before a snapshot's watermark are re-checked
+# when opening it, for writes that committed after the watermark was read.
+_WATERMARK_SLACK = timedelta(minutes=5)
+
+
+class VectorIndex:
+	"""Normalized embedding matrix plus row metadata for one site.
+
+	Filters on listing fields are resolved through precomputed bitmaps,
+	tag filters through tag_index, before scoring. Catalogs of at least ``ann_min_items`` rows also
+	get an IVF index; queries then score only the ``nprobe`` closest clusters.
+
+	With ``quantization="int8"`` the matrix is held as a QuantizedMatrix
+	(about 4x smaller). The first pass ranks on it; the top ``rescore`` hits
+	are then rescored with full-precision vectors from ``vector_source``
+	(names -> {name: vector}) when one is given.
+	"""
+
+	def __init__(
+		self,
+		rows: list[dict],
+		vectors: list,
+		generation: int = 0,
+		ann_min_items: int = _ANN_MIN_ITEMS,
+		nprobe: int = _ANN_NPROBE,
+		quantization: str | None = None,
+		rescore: int = _RESCORE,
+		vector_source=None,
+		matrix=None,
+		ann: IVFIndex | None = None,
+		watermark: str | None = None,
+	):
+		"""``matrix`` (and ``ann``) may be passed prebuilt, e.g. memory-mapped
+		from index_store, instead of normalizing ``vectors``. It is only ever
+		read from."""
+		self.generation = generation
+		# Newest embedding ``modified`` this index is known to include
+		self.watermark = watermark
+		# Whether the matrix is the memory-mapped current snapshot
+		self.shared = False
+		self.rows = rows
+		self.names = [row["name"] for row in rows]
+		self.positions = {name: i for i, name in enumerate(self.names)}
+		if matrix is None:
+			matrix = np.asarray(vectors, dtype=np.float32)
+			matrix = normalize_rows(matrix) if len(matrix) else np.zeros((0, 0), dtype=np.float32)
+			if quantization == "int8":
+				matrix = QuantizedMatrix.from_float(matrix)
+		self.matrix = matrix
+		# Rows added after the matrix, at positions len(matrix) and up
+		self.overlay = None
+		# Which positions are still current, once any has been dropped
+		self.live = None
+		self.quantized = isinstance(matrix, QuantizedMatrix)
+		self.rescore = rescore
+		self.vector_source = vector_source
+		self.bitmaps = BitmapIndex(rows)
+		self.ann_min_items = ann_min_items
+		self.nprobe = nprobe
+		if len(self) < ann_min_items:
+			ann = None
+		elif ann is None:
+			ann = IVFIndex.train(self.matrix)
+		self.ann = ann
+
+	@property
+	def dim(self) -> int:
+		matrix = self.matrix if len(self.matrix) or self.overlay is None else self.overlay
+		return matrix.shape[1]
+
+	def __len__(self) -> int:
+		return len(self.positions)
+
+	@classmethod
+	def build(cls, generation: int = 0) -> VectorIndex:
+		"""Load all embedded Registry items from the database."""
+		watermark = _watermark()
+		items = _load_rows()
+
+		decoded = []
+		for item in items:
+			vector = decode_embedding(item.pop("embedding"))
+			if vector is not None:
+				decoded.append((item, vector))
+
+		# Rows embedded with a different model (dimension) cannot be compared
+		# against each other; keep the dominant dimension only.
+		if decoded:
+			dim = Counter(v.shape[0] for _, v in decoded).most_common(1)[0][0]
+			decoded = [(item, v) for item, v in decoded if v.shape[0] == dim]
+
+		return cls(
+			[item for item, _ in decoded],
+			[v for _, v in decoded],
+			generation,
+			watermark=watermark,
+			**_settings(),
+		)
+
+	@classmethod
+	def open(cls, generation: int = 0) -> VectorIndex | None:
+		"""Start from the current on-disk snapshot and catch up with the database.
+
+		The matrix (and IVF lists) are memory-mapped; listing fields are
+		read fresh, without the embeddings. Only embeddings modified
+		since the snapshot's watermark, or of items it lacks, are loaded and
+		patched in; items no longer embedded are dropped. Returns None when
+		there is no usable snapshot or when rebuilding is cheaper than
+		catching up.
+		"""
+		stored = index_store.load()
+		settings = _settings()
+		if (
+			stored is None
+			or not stored.meta.get("watermark")
+			or stored.meta.get("model") != _model()
+			or stored.meta.get("quantized") != (settings["quantization"] == "int8")
+		):
+			return None
+
+		watermark = _watermark()
+		rows = {row["name"]: row for row in _load_rows(embeddings=False)}
+		known = set(stored.names)
+		removed = [name for name in stored.names if name not in rows]
+		changed = [name for name in _modified_since(stored.meta["watermark"]) if name in rows]
+		changed += [name for name in rows if name not in known]
+		if len(changed) > len(rows) // 2:
+			return None
+
+		index = cls(
+			[rows.get(name) or {"name": name} for name in stored.names],
+			None,
+			generation,
+			matrix=stored.matrix,
+			ann=stored.ann,
+			watermark=stored.meta["watermark"],
+			**settings,
+		)
+		index.shared = True
+
+		updates = []
+		for row in _load_rows(names=changed) if changed else []:
+			vector = decode_embedding(row.pop("embedding"))
+			pos = index.positions.get(row["name"])
+			if vector is None or pos is None or not index._holds(pos, vector):
+				updates.append((row, vector))
+
+		for name in removed:
+			index.remove(name)
+		for row, vector in updates:
+			if vector is None:
+				index.remove(row["name"])
+			else:
+				index.upsert(row, vector)
+		if removed or updates:
+			index.watermark = watermark
+		return index
+
+	def share(self) -> VectorIndex | None:
+		"""Write this index to the shared store; return its memory-mapped equivalent.
+
+		The overlay is merged into the written matrix. Only the first worker
+		to get here for a generation writes; the others open that version on
+		their next rebuild.
+		"""
+		if not len(self) or not self.watermark or not index_store.claim(self.generation):
+			return None
+		index = self.compacted()
+		try:
+			index_store.save(
+				index.names,
+				index.matrix,
+				index.ann,
+				{
+					"generation": self.generation,
+					"model": _model(),
+					"dim": self.dim,
+					"watermark": self.watermark,
+				},
+			)
+		except OSError:
+			frappe.log_error(frappe.get_traceback(), "Registry vector index store")
+			return None
+
+		stored = index_store.load()
+		if stored is None or stored.names != index.names:
+			return None
+		shared = self._derive(index.rows, stored.matrix, stored.ann)
+		shared.shared = True
+		return shared
+
+	def compacted(self) -> VectorIndex:
+		"""The same rows in a single matrix, without overlay or dropped rows."""
+		if self.overlay is None and self.live is None:
+			return self
+
+		keep = np.array(sorted(self.positions.values()), dtype=np.int64)
+		base = len(self.matrix)
+		head, tail = keep[keep < base], keep[keep >= base] - base
+		matrix = self.matrix[head]
+		ann = IVFIndex(self.ann.centroids, self.ann.assignments[head]) if self.ann else None
+		if len(tail):
+			added = self.overlay[tail]
+			if not len(matrix):
+				matrix = added
+			else:
+				matrix = matrix.append(added) if self.quantized else np.vstack([matrix, added])
+			if ann:
+				ann.add(added)
+		return self._derive([self.rows[pos] for pos in keep.tolist()], matrix, ann)
+
+	def _derive(self, rows: list[dict], matrix, ann: IVFIndex | None) -> VectorIndex:
+		return VectorIndex(
+			rows,
+			None,
+			self.generation,
+			self.ann_min_items,
+			self.nprobe,
+			rescore=self.rescore,
+			vector_source=self.vector_source,
+			matrix=matrix,
+			ann=ann,
+			watermark=self.watermark,
+		)
+
+	def copy(self) -> VectorIndex:
+		"""A copy to patch; the matrix and IVF lists are shared, not copied."""
+		clone = VectorIndex.__new__(VectorIndex)
+		clone.__dict__.update(self.__dict__)
+		clone.rows = list(self.rows)
+		clone.names = list(self.names)
+		clone.positions = dict(self.positions)
+		clone.overlay = self.overlay.copy() if self.overlay is not None else None
+		clone.live = self.live.copy() if self.live is not None else None
+		clone.bitmaps = self.bitmaps.copy()
+		clone.shared = False
+		return clone
+
+	def _holds(self, pos: int, vector) -> bool:
+		"""Whether row ``pos`` already stores ``vector``."""
+		vector = normalize_rows(np.asarray(vector, dtype=np.float32).reshape(1, -1))
+		if vector.shape[1] != self.dim:
+			return False
+		base = len(self.matrix)
+		current = self.matrix[pos] if pos < base else self.overlay[pos - base]
+		if self.quantized:
+			expected = QuantizedMatrix.from_float(vector)
+			codes_match = np.array_equal(current.codes, expected.codes)
+			return codes_match and np.array_equal(current.scales, expected.scales)
+		return np.array_equal(current, vector[0])
+
+	def upsert(self, row: dict, vector) -> None:
+		"""Insert or replace a single row.
+
+		Rows of the matrix are replaced by dropping them and adding the new
+		version to the overlay; overlay rows are replaced in place.
+		"""
+		vector = normalize_rows(np.asarray(vector, dtype=np.float32).reshape(1, -1))
+		if (len(self.matrix) or self.overlay is not None) and vector.shape[1] != self.dim:
+			self.remove(row["name"])
+			return
+		self.shared = False
+
+		base = len(self.matrix)
+		pos = self.positions.get(row["name"])
+		if pos is not None and pos >= base:
+			self.rows[pos] = row
+			self.overlay[pos - base] = vector[0]
+			self.bitmaps.set(pos, row)
+			return
+		if pos is not None:
+			self._drop(pos)
+
+		self.positions[row["name"]] = len(self.names)
+		self.names.append(row["name"])
+		self.rows.append(row)
+		if self.overlay is None:
+			self.overlay = QuantizedMatrix.from_float(vector) if self.quantized else vector
+		elif self.quantized:
+			self.overlay = self.overlay.append(vector)
+		else:
+			self.overlay = np.vstack([self.overlay, vector])
+		self.bitmaps.append(row)
+		if self.live is not None:
+			self.live = np.append(self.live, True)
+
+	def remove(self, name: str) -> None:
+		"""Drop a row; its slot stays, masked out, until the index is compacted."""
+		pos = self.positions.pop(name, None)
+		if pos is not None:
+			self.shared = False
+			self._drop(pos)
+
+	def _drop(self, pos: int) -> None:
+		if self.live is None:
+			self.live = np.ones(len(self.names), dtype=bool)
+		self.live[pos] = False
+
+	def ranked(
+		self,
+		query,
+		filters: dict | None = None,
+		limit: int = 20,
+		threshold: float = 0.0,
+		exact: bool = False,
+		tags: list[str] | None = None,
+	):
+		"""The best matches plus how many scored rows reach ``threshold``.
+
+		Only rows matching every field filter and carrying all ``tags`` are
+		scored. Returns ``(hits, total, total_exact)``: ``hits`` as
+		[(row_position, score)], best first. The count comes from the same
+		pass; it is a lower bound (``total_exact`` False) when the IVF index
+		limited scoring to the probed clusters.
+		"""
+		if not len(self) or limit <= 0:
+			return [], 0, True
+
+		query = np.asarray(query, dtype=np.float32)
+		norm = np.linalg.norm(query)
+		if query.shape[0] != self.dim or norm == 0:
+			return [], 0, True
+		query = query / norm
+
+		candidates = None
+		mask = self._filter_mask(filters, tags)
+		if self.live is not None:
+			mask = self.live if mask is None else mask & self.live
+		base = len(self.matrix)
+		if mask is not None:
+			candidates = np.flatnonzero(mask[:base])
+		use_ann = (
+			not exact
+			and self.ann is not None
+			and (candidates is None or len(candidates) >= self.ann_min_items)
+		)
+		if use_ann:
+			probed = self.ann.candidates(query, self.nprobe)
+			candidates = probed if candidates is None else np.intersect1d(candidates, probed)
+
+		if not base:
+			scores = np.zeros(0, dtype=np.float32)
+		elif candidates is None:
+			scores = self.matrix @ query
+		else:
+			scores = self.matrix[candidates] @ query
+		if self.overlay is not None:
+			# Always scored exactly; the IVF lists only cover the matrix
+			added = np.arange(len(self.overlay)) if mask is None else np.flatnonzero(mask[base:])
+			candidates = np.concatenate([np.arange(base) if candidates is None else candidates, base + added])
+			scores = np.concatenate([scores, self.overlay[added] @ query])
+		if not len(scores):
+			return [], 0, not use_ann
+		total = int(np.count_nonzero(scores >= threshold))
+
+		rescore = self.rescore if self.quantized and self.vector_source is not None else 0
+		k = min(max(limit, rescore), len(scores))
+		top = np.argpartition(-scores, k - 1)[:k]
+		top = top[np.argsort(-scores[top], kind="stable")]
+		positions = top if candidates is None else candidates[top]
+		scores = scores[top]
+		if rescore:
+			positions, scores = self._rescore(query, positions, scores, rescore)
+		positions, scores = positions[:limit], scores[:limit]
+		hits = [
+			(int(pos), float(score))
+			for pos, score in zip(positions, scores, strict=True)
+			if score >= threshold
+		]
+		return hits, max(total, len(hits)), not use_ann
+
+	def _rescore(self, query, positions, scores, count):
+		"""Re-rank the first ``count`` quantized hits by full-precision similarity."""
+		head = positions[:count]
+		vectors = self.vector_source([self.names[pos] for pos in head.tolist()])
+		exact = scores[: len(head)].copy()
+		for i, pos in enumerate(head.tolist()):
+			vector = vectors.get(self.names[pos])
+			if vector is not None and vector.shape[0] == self.dim:
+				norm = np.linalg.norm(vector)
+				if norm:
+					exact[i] = float(vector @ query) / norm
+		order = np.argsort(-exact, kind="stable")
+		return (
+			np.concatenate([head[order], positions[len(head) :]]),
+			np.concatenate([exact[order], scores[len(head) :]]),
+		)
+
+	def _filter_mask(self, filters: dict | None, tags: list[str] | None) -> np.ndarray | None:
+		if self.bitmaps.supports(filters):
+			mask = self.bitmaps.mask(filters)
+		else:
+			# Fields without a bitmap: scan row metadata
+			mask = np.fromiter(
+				(all(row.get(field) == value for field, value in filters.items()) for row in self.rows),
+				dtype=bool,
+				count=len(self.rows),
+			)
+
+		names = names_with_tags(tags)
+		if names is None:
+			return mask
+		tag_mask = np.zeros(len(self.names), dtype=bool)
+		tag_mask[[self.positions[name] for name in names if name in self.positions]] = True
+		return tag_mask if mask is None else mask & tag_mask
+
+
+def _settings() -> dict:
+	"""VectorIndex keyword arguments from site_config."""
+	return {
+		"ann_min_items": cint(frappe.conf.get("registry_ann_min_items") or _ANN_MIN_ITEMS),
+		"nprobe": cint(frappe.conf.get("registry_ann_nprobe") or _ANN_NPROBE),
+		"quantization": frappe.conf.get("registry_vector_quantization", _QUANTIZATION),
+		"rescore": cint(frappe.conf.get("registry_rescore_candidates", _RESCORE)),
+		"vector_source": _load_vectors,
+	}
+
+
+def _model() -> str:
+	from senaerp_platform.registry.embedding import embedding_model
+
+	return embedding_model()
+
+
+def _load_rows(
+	registry_name: str | None = None, embeddings: bool = True, names: list[str] | None = None
+) -> list[dict]:
+	"""Listing fields plus stored embedding, for all, one or some Registry items.
+
+	Only embeddings made by the current backend's model (or of unknown
+	model, from before it was recorded) are comparable with queries. With
+	``embeddings=False`` the same rows are returned without the vectors.
+	"""
+	from senaerp_platform.registry.embedding import SEARCH_FIELDS
+
+	fields = ", ".join(f"r.`{field}`" for field in SEARCH_FIELDS)
+	if embeddings:
+		fields += ", si.embedding"
+	condition = "AND r.name = %(name)s" if registry_name else ""
+	if names:
+		condition += " AND r.name IN %(names)s"
+	return frappe.db.sql(
+		f"""
+		SELECT {fields}
+		FROM `tabRegistry Search Index` si
+		INNER JOIN `tabRegistry` r ON r.name = si.registry
+		WHERE IFNULL(si.embedding, '') != ''
+			AND (si.embedding_model = %(model)s OR IFNULL(si.embedding_model, '') = '')
+			{condition}
+		""",
+		{"name": registry_name, "names": tuple(names or ()), "model": _model()},
+		as_dict=True,
+	)
+
+
+def _load_vectors(names: list[str]) -> dict[str, np.ndarray]:
+	"""Stored full-precision embeddings of ``names``, for rescoring."""
+	if not names:
+		return {}
+	rows = frappe.db.sql(
+		"SELECT registry, embedding FROM `tabRegistry Search Index` WHERE registry IN %(names)s",
+		{"names": tuple(names)},
+	)
+	return {name: vector for name, value in rows if (vector := decode_embedding(value)) is not None}
+
+
+def _watermark() -> str | None:
+	"""Newest embedding write, read before the rows it covers."""
+	value = frappe.db.sql("SELECT MAX(modified) FROM `tabRegistry Search Index`")[0][0]
+	return str(value) if value else None
+
+
+def _modified_since(watermark: str) -> list[str]:
+	"""Registry names whose embedding may have changed after ``watermark``."""
+	return frappe.db.sql_list(
+		"SELECT registry FROM `tabRegistry Search Index` WHERE modified > %(since)s",
+		{"since": get_datetime(watermark) - _WATERMARK_SLACK},
+	)
+
+
+# ---------------------------------------------------------------------------
+# Per-worker cache and invalidation
+# ---------------------------------------------------------------------------
+
+
+def _open_or_build(generation: int) -> VectorIndex:
+	index = VectorIndex.open(generation)
+	if index is None:
+		# Only full builds are written back; catching up from a snapshot and
+		# per-item patches stay private to the worker (see snapshot()).
+		index = VectorIndex.build(generation)
+		index = index.share() or index
+	return index
+
+
+_indexes = SiteIndexes(_open_or_build, _GENERATION_KEY)
+
+
+def get_index() -> VectorIndex:
+	"""Return this worker's index for the current site, rebuilding if stale."""
+	return _indexes.get()
+
+
+def snapshot() -> None:
+	"""Make sure an up-to-date snapshot is on disk.
+
+	Runs after rebuild_search_index, hourly and on migrate, which bounds
+	how far behind the snapshot (and so each worker's catch-up) can get.
+
+	Also warms this process's index, so its next search is fast too, and
+	swaps it for the memory-mapped snapshot it just wrote.
+	"""
+	index = get_index()
+	if not index.shared:
+		shared = index.share()
+		if shared is not None:
+			_indexes.replace(shared)
+
+
+def invalidate() -> None:
+	"""Force every worker to rebuild on its next search."""
+	_indexes.invalidate()
+
+
+def refresh_item(registry_name: str) -> None:
+	"""Publish a change to one Registry item once the transaction commits."""
+	frappe.db.after_commit.add(lambda: _apply_change(registry_name))
+
+
+def _apply_change(registry_name: str) -> None:
+	rows = _load_rows(registry_name)
+	row = rows[0] if rows else None
+	vector = decode_embedding(row.pop("embedding")) if row else None
+
+	def patch(index: VectorIndex) -> None:
+		if vector is None:
+			index.remove(registry_name)
+		else:
+			index.upsert(row, vector)
+
+	_indexes.publish(patch)